@@ -3,6 +3,11 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the rider event stream (/api/riders/events/) from this application,
+e.g. ``uvicorn config.asgi:application``. With more than one worker or node,
+set EVENT_BROKER to a broker that relays between processes, such as
+``core.pubsub.RedisBroker``.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
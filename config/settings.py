@@ -232,6 +232,31 @@ if not DEBUG:
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Feed versions and rider positions must be shared by every worker process,
+# so production should set REDIS_URL (needs the redis package).
+
+REDIS_URL = os.environ.get('REDIS_URL', '')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Pub/sub behind the rider event stream; the in-memory broker only reaches
+# subscribers in the publishing process.
+EVENT_BROKER = 'core.pubsub.RedisBroker' if REDIS_URL else 'core.pubsub.InMemoryBroker'
+
 # Logging Configuration
 # https://docs.djangoproject.com/en/5.0/topics/logging/
 
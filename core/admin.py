@@ -1,3 +1,18 @@
 from django.contrib import admin
+from .models import OutboxMessage, IdempotencyKey
 
-# Register your models here.
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('event_type', 'status', 'attempts', 'created_at', 'processed_at')
+    list_filter = ('status', 'event_type')
+    search_fields = ('event_type', 'last_error')
+    readonly_fields = ('created_at', 'claimed_at', 'processed_at')
+
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ('scope', 'key', 'user', 'status', 'response_status', 'created_at', 'expires_at')
+    list_filter = ('scope', 'status')
+    search_fields = ('key', 'user__username')
+    readonly_fields = ('created_at',)
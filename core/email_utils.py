@@ -1,4 +1,4 @@
-from django.core.mail import EmailMultiAlternatives
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.template.loader import render_to_string
 from django.conf import settings
 from decimal import Decimal
@@ -12,14 +12,10 @@ def send_order_confirmation_email(order, payment):
     Send order confirmation email to customer
     """
     try:
-        # Calculate totals for email using database settings
-        from core.utils import get_delivery_fee, get_tax_rate
-        
-        subtotal = order.total_amount
-        delivery_fee = get_delivery_fee()
-        tax_rate = get_tax_rate() / Decimal('100')  # Convert percentage to decimal
-        tax_amount = (subtotal + delivery_fee) * tax_rate
-        total_amount = subtotal + delivery_fee + tax_amount
+        # Totals as snapshotted on the order at checkout
+        order.ensure_charges()
+        tax_amount = order.tax_amount
+        total_amount = order.grand_total
         
         context = {
             'order': order,
@@ -62,14 +58,10 @@ def send_restaurant_notification_email(order, payment):
     try:
         restaurant = order.restaurant
         
-        # Calculate totals for email using database settings
-        from core.utils import get_delivery_fee, get_tax_rate
-        
-        subtotal = order.total_amount
-        delivery_fee = get_delivery_fee()
-        tax_rate = get_tax_rate() / Decimal('100')  # Convert percentage to decimal
-        tax_amount = (subtotal + delivery_fee) * tax_rate
-        total_amount = subtotal + delivery_fee + tax_amount
+        # Totals as snapshotted on the order at checkout
+        order.ensure_charges()
+        tax_amount = order.tax_amount
+        total_amount = order.grand_total
         
         context = {
             'order': order,
@@ -250,3 +242,50 @@ Thank you for choosing {receipt.order.restaurant.name}!
     except Exception as e:
         logger.error(f"Failed to send POS receipt email for receipt {receipt.receipt_number}: {str(e)}")
         return False
+
+
+class BulkEmailFailed(Exception):
+    """A send_bulk_email send failed; unsent lists the recipients it did not reach"""
+    
+    def __init__(self, error, unsent):
+        super().__init__(str(error))
+        self.unsent = unsent
+
+
+def send_bulk_email(subject, text_content, recipients, html_content=None):
+    """
+    Send the same email to many recipients over one SMTP connection
+    
+    Each recipient gets their own message so addresses are not shared.
+    Messages go out one by one on a connection opened once, instead of one
+    connection per recipient. If a send fails, BulkEmailFailed is raised
+    with the recipients not reached yet, so a retry skips those who already
+    got it.
+    
+    Returns:
+        int: Number of messages sent
+    """
+    recipients = list(dict.fromkeys(email for email in recipients if email))
+    if not recipients:
+        return 0
+    
+    sent = 0
+    with get_connection() as connection:
+        for index, recipient in enumerate(recipients):
+            email = EmailMultiAlternatives(
+                subject=subject,
+                body=text_content,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=[recipient],
+                connection=connection,
+            )
+            if html_content:
+                email.attach_alternative(html_content, "text/html")
+            try:
+                sent += connection.send_messages([email]) or 0
+            except Exception as e:
+                logger.error(f"Bulk email '{subject}' failed after {sent} of {len(recipients)} recipients: {e}")
+                raise BulkEmailFailed(e, recipients[index:])
+    
+    logger.info(f"Bulk email '{subject}' sent to {sent} of {len(recipients)} recipients")
+    return sent
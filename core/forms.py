@@ -33,3 +33,10 @@ class ComplaintForm(forms.ModelForm):
             'description': 'Description',
             'order_number': 'Order Number (Optional)'
         }
+    
+    def clean_order_number(self):
+        # Store order numbers the way orders do ('#ab12cd34 ' -> 'AB12CD34') so lookups can use the index
+        order_number = self.cleaned_data.get('order_number')
+        if order_number:
+            order_number = order_number.strip().lstrip('#').upper()
+        return order_number
@@ -0,0 +1,184 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+from django.http.request import RawPostDataException
+from django.utils import timezone
+from datetime import timedelta
+from functools import wraps
+import hashlib
+import json
+import logging
+
+from .models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+IDEMPOTENCY_FIELD = 'idempotency_key'
+DEFAULT_TTL = timedelta(hours=24)
+# An in_progress key older than this was left by a worker that died mid-request
+IN_PROGRESS_TIMEOUT = timedelta(seconds=getattr(settings, 'IDEMPOTENCY_IN_PROGRESS_SECONDS', 120))
+FORM_CONTENT_TYPES = ('application/x-www-form-urlencoded', 'multipart/form-data')
+REPLAYED_HEADERS = ('Location', 'X-Next-Cursor', 'X-Previous-Cursor')
+
+
+def get_idempotency_key(request):
+    """Key from the Idempotency-Key header, or from a hidden form field for browser forms"""
+    key = request.META.get(IDEMPOTENCY_HEADER)
+    if not key and request.content_type in FORM_CONTENT_TYPES:
+        key = request.POST.get(IDEMPOTENCY_FIELD)
+    return (key or '').strip()
+
+
+def request_fingerprint(request):
+    """Hash of the request body, used to reject a key reused for a different request"""
+    try:
+        body = request.body
+    except RawPostDataException:
+        # Multipart body already consumed by the CSRF check; hash the parsed fields instead
+        body = json.dumps(sorted(request.POST.lists())).encode()
+    return hashlib.sha256(request.method.encode() + request.path.encode() + body).hexdigest()
+
+
+def serialize_response(response):
+    """
+    Body, content type and headers worth replaying from a response.
+
+    DRF responses are stored from their data since they are only rendered
+    after the view returns; everything else from its rendered content.
+    """
+    if hasattr(response, 'data') and not getattr(response, 'is_rendered', True):
+        body = json.dumps(response.data, cls=DjangoJSONEncoder, separators=(',', ':'))
+        content_type = 'application/json'
+    else:
+        if hasattr(response, 'render') and not response.is_rendered:
+            response.render()
+        body = response.content.decode(response.charset)
+        content_type = response['Content-Type']
+
+    headers = {name: response[name] for name in REPLAYED_HEADERS if response.has_header(name)}
+    headers['Content-Type'] = content_type
+    return body, headers
+
+
+def replay(record):
+    """Rebuild the stored response"""
+    headers = dict(record.response_headers)
+    response = HttpResponse(
+        record.response_body,
+        status=record.response_status,
+        content_type=headers.pop('Content-Type', None)
+    )
+    for name, value in headers.items():
+        response[name] = value
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(scope, ttl=DEFAULT_TTL):
+    """
+    Make a POST view safe to retry with an Idempotency-Key.
+
+    The first request with a given key runs the view and its response is
+    stored for ttl; retries with the same key and body get that response
+    back after a single indexed lookup, without running the view again.
+    A retry that arrives while the first request is still running gets a
+    409; a key left in progress for longer than IN_PROGRESS_TIMEOUT is
+    taken as abandoned by a worker that died, and the retry runs the view
+    again. Reusing a key for a different request gets a 422. Responses
+    with a 5xx status are not stored, so the client can retry them.
+    Requests without a key, or from anonymous users, run as before.
+
+    Works on function views, DRF @api_view functions (apply it below
+    @api_view) and, through method_decorator, on class-based views.
+
+    Args:
+        scope: str - Name of the operation; keys are unique per user and scope
+        ttl: timedelta - How long a stored response is replayed
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'POST' or not request.user.is_authenticated:
+                return view_func(request, *args, **kwargs)
+
+            # Hash the body before anything parses it off the stream
+            request_hash = request_fingerprint(request)
+            key = get_idempotency_key(request)
+            if not key:
+                return view_func(request, *args, **kwargs)
+            if len(key) > 255:
+                return JsonResponse({'error': 'Idempotency-Key must be at most 255 characters'}, status=400)
+
+            now = timezone.now()
+            record = IdempotencyKey.objects.filter(user=request.user, scope=scope, key=key).first()
+            if record and (record.expires_at <= now or (
+                record.status == 'in_progress' and record.created_at <= now - IN_PROGRESS_TIMEOUT
+            )):
+                # Expired, or abandoned mid-request; if two retries both get here
+                # the unique constraint lets only one of them take the key over
+                record.delete()
+                record = None
+
+            if record:
+                if record.request_hash != request_hash:
+                    return JsonResponse({
+                        'error': 'This Idempotency-Key was already used for a different request'
+                    }, status=422)
+                if record.status == 'in_progress':
+                    return JsonResponse({
+                        'error': 'A request with this Idempotency-Key is still being processed'
+                    }, status=409)
+                return replay(record)
+
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(
+                        user=request.user,
+                        scope=scope,
+                        key=key,
+                        request_hash=request_hash,
+                        expires_at=now + ttl
+                    )
+            except IntegrityError:
+                # Another request with the same key got in first
+                return JsonResponse({
+                    'error': 'A request with this Idempotency-Key is still being processed'
+                }, status=409)
+
+            try:
+                response = view_func(request, *args, **kwargs)
+            except Exception:
+                record.delete()
+                raise
+
+            if response.status_code >= 500 or getattr(response, 'streaming', False):
+                record.delete()
+                return response
+
+            try:
+                body, headers = serialize_response(response)
+            except Exception as e:
+                logger.error(f"Could not store response for idempotency key {key} ({scope}): {e}")
+                record.delete()
+                return response
+
+            # An update rather than save(), as a retry may have taken the key over
+            # if this request ran past IN_PROGRESS_TIMEOUT
+            IdempotencyKey.objects.filter(pk=record.pk).update(
+                status='completed',
+                response_status=response.status_code,
+                response_body=body,
+                response_headers=headers
+            )
+            return response
+
+        return wrapper
+    return decorator
+
+
+def purge_expired_keys():
+    """Delete stored responses whose TTL has passed; returns the number deleted"""
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
@@ -0,0 +1,136 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+import json
+import re
+import uuid
+
+from orders.models import Order, order_number_q
+from payments.models import Payment
+from restaurants.models_payment import RestaurantEarning
+from riders.models import DeliveryAssignment
+from superadmin.models import Complaint
+
+
+def hot_queries():
+    """
+    The hottest view queries, as (name, queryset, ordered_walk) tuples.
+
+    ordered_walk marks queries that legitimately read an index end to end
+    in order and stop at their LIMIT; for every other query any full scan,
+    of the table or of an index, is a regression. Filter values are
+    placeholders: the plan depends on the shape of the query and the
+    indexes available, not on whether the rows exist.
+    """
+    restaurant_id = 1
+    customer_id = 1
+    rider_id = uuid.uuid4()
+
+    return [
+        ('restaurant dashboard pending orders',
+         Order.objects.filter(restaurant_id=restaurant_id, status='pending'), False),
+        ('printable active orders',
+         Order.objects.filter(
+             restaurant_id=restaurant_id,
+             status__in=['pending', 'confirmed', 'preparing', 'ready']
+         ).order_by('created_at'), False),
+        ('customer order list',
+         Order.objects.filter(customer_id=customer_id).order_by('-created_at', '-id')[:11], False),
+        ('restaurant order list',
+         Order.objects.filter(restaurant_id=restaurant_id).order_by('-created_at', '-id')[:11], False),
+        ('superadmin order list',
+         Order.objects.order_by('-created_at', '-id')[:21], True),
+        ('superadmin order list by status',
+         Order.objects.filter(status='pending').order_by('-created_at', '-id')[:21], False),
+        ('rider available orders',
+         Order.objects.filter(status='ready', delivery_assignments__isnull=True).order_by('created_at'), False),
+        ('rider active orders',
+         DeliveryAssignment.objects.filter(
+             rider_id=rider_id,
+             status__in=['assigned', 'picked_up', 'delivering']
+         ).order_by('-assigned_at'), False),
+        ('rider delivery history',
+         DeliveryAssignment.objects.filter(rider_id=rider_id).order_by('-assigned_at', '-id')[:21], False),
+        ('rider completed deliveries',
+         DeliveryAssignment.objects.filter(rider_id=rider_id, status='delivered'), False),
+        ('restaurant unpaid earnings',
+         RestaurantEarning.objects.filter(restaurant_id=restaurant_id, is_paid_out=False), False),
+        ('order number lookup',
+         Order.objects.filter(order_number_q('AB12CD34')), False),
+        ('order number prefix search',
+         Order.objects.filter(order_number_q('#AB12')).order_by('-created_at', '-id')[:21], False),
+        ('complaint order number search',
+         Complaint.objects.filter(order_number_q('AB12')), False),
+        ('paystack verification',
+         Payment.objects.filter(paystack_reference='reference'), False),
+    ]
+
+
+def full_scans(queryset, ordered_walk=False):
+    """
+    Return the tables the database would read with a full scan for queryset.
+
+    A full index scan counts as a full scan unless ordered_walk is set.
+    Understands MySQL/MariaDB (JSON plans), PostgreSQL and SQLite.
+    """
+    vendor = connection.vendor
+
+    if vendor == 'mysql':
+        plan = json.loads(queryset.explain(format='json'))
+        # Rows come back JSON-encoded a second time by QuerySet.explain()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        tables = []
+
+        def walk(node):
+            if isinstance(node, dict):
+                if node.get('access_type') == 'ALL' or (node.get('access_type') == 'index' and not ordered_walk):
+                    tables.append(node.get('table_name'))
+                for value in node.values():
+                    walk(value)
+            elif isinstance(node, list):
+                for value in node:
+                    walk(value)
+
+        walk(plan)
+        return tables
+
+    plan = queryset.explain()
+    if vendor == 'postgresql':
+        return re.findall(r'Seq Scan on (\S+)', plan)
+    if vendor == 'sqlite':
+        return [
+            table for table, index in re.findall(r'\bSCAN (\S+)( USING (?:COVERING )?INDEX .*)?$', plan, re.MULTILINE)
+            if not (index and ordered_walk)
+        ]
+
+    raise CommandError(f"Query plan checks are not supported on {vendor}")
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot order, assignment, earning and payment queries and fail if any needs a full table scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Print the full plan of every query'
+        )
+
+    def handle(self, *args, **options):
+        failures = []
+
+        for name, queryset, ordered_walk in hot_queries():
+            tables = full_scans(queryset, ordered_walk)
+            if options['verbose_plans']:
+                self.stdout.write(f'-- {name}\n{queryset.explain()}\n')
+
+            if tables:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"FULL SCAN  {name}: {', '.join(tables)}"))
+            else:
+                self.stdout.write(f'ok         {name}')
+
+        if failures:
+            raise CommandError(f"{len(failures)} hot queries regressed to a full table scan")
+
+        self.stdout.write(self.style.SUCCESS('All hot queries use an index'))
@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand
+from datetime import timedelta
+import time
+
+from core.outbox import claim_batch, process_batch
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued SMS and email notifications from the outbox in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Number of messages claimed per batch'
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=5,
+            help='Attempts before a message is marked as failed'
+        )
+        parser.add_argument(
+            '--retry-after',
+            type=int,
+            default=60,
+            help='Seconds to wait before retrying a message whose handler failed'
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=10,
+            help='Minutes after which a message stuck in processing is claimed again'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling the outbox instead of exiting once it is empty'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between polls when --loop is set'
+        )
+
+    def handle(self, *args, **options):
+        retry_after = timedelta(seconds=options['retry_after'])
+        stale_after = timedelta(minutes=options['stale_after'])
+        total_sent = 0
+        total_failed = 0
+
+        while True:
+            batch = claim_batch(
+                options['batch_size'],
+                retry_after=retry_after,
+                stale_after=stale_after
+            )
+
+            if batch:
+                sent, failed = process_batch(batch, max_attempts=options['max_attempts'])
+                total_sent += sent
+                total_failed += failed
+                self.stdout.write(f'Processed {len(batch)} messages: {sent} sent, {failed} failed')
+                continue
+
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Outbox drained: {total_sent} sent, {total_failed} failed')
+        )
@@ -0,0 +1,223 @@
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from datetime import timedelta
+import logging
+
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+
+class SendFailed(Exception):
+    """
+    A handler's notification was not delivered; the message is retried.
+
+    payload, if given, replaces those arguments for the retry, e.g. to
+    leave out recipients who were already reached.
+    """
+
+    def __init__(self, message, payload=None):
+        super().__init__(message)
+        self.payload = payload
+
+
+def enqueue(event_type, **payload):
+    """
+    Queue a notification for the outbox worker.
+
+    Call this inside the transaction that makes the change being reported:
+    the message is only visible to process_outbox once that transaction
+    commits, and disappears with it on rollback.
+
+    Args:
+        event_type: str - Key into HANDLERS
+        **payload: JSON-serialisable arguments passed to the handler
+    """
+    if event_type not in HANDLERS:
+        raise ValueError(f"Unknown outbox event type: {event_type}")
+    return OutboxMessage.objects.create(event_type=event_type, payload=payload)
+
+
+def enqueue_many(event_type, payloads):
+    """Queue one message per payload with a single insert (see enqueue)"""
+    if event_type not in HANDLERS:
+        raise ValueError(f"Unknown outbox event type: {event_type}")
+    return OutboxMessage.objects.bulk_create([
+        OutboxMessage(event_type=event_type, payload=payload)
+        for payload in payloads
+    ])
+
+
+def send_order_confirmation_sms(order_id):
+    """Send the customer's order confirmation SMS"""
+    from orders.models import Order
+    from sms_service import sms_service
+
+    order = Order.objects.select_related('customer', 'restaurant').get(pk=order_id)
+    # The SMS service reports failures instead of raising them
+    response = sms_service.send_order_confirmation(order)
+    if response is not None and response.get('status') != 'success':
+        raise SendFailed(f"Order confirmation SMS failed: {response.get('message')}")
+
+
+def _paid_payment(payment_id):
+    from payments.models import Payment
+
+    return Payment.objects.select_related(
+        'order', 'order__customer', 'order__restaurant', 'order__restaurant__owner'
+    ).get(pk=payment_id)
+
+
+def send_order_confirmation_email(payment_id):
+    """Send the customer's confirmation email for a paid order"""
+    from .email_utils import send_order_confirmation_email as send
+
+    payment = _paid_payment(payment_id)
+    # The email helpers return False instead of raising
+    if not send(payment.order, payment):
+        raise SendFailed(f"Order confirmation email failed for payment {payment_id}")
+
+
+def send_restaurant_notification_email(payment_id):
+    """Send the restaurant's new order email for a paid order"""
+    from .email_utils import send_restaurant_notification_email as send
+
+    payment = _paid_payment(payment_id)
+    if not send(payment.order, payment):
+        raise SendFailed(f"Restaurant notification email failed for payment {payment_id}")
+
+
+def send_payment_confirmation_emails(payment_id):
+    """
+    Both emails for a paid order in one message; only for messages queued
+    before they were split, since a retry resends whichever already went out
+    """
+    send_order_confirmation_email(payment_id)
+    send_restaurant_notification_email(payment_id)
+
+
+def send_notification_emails(subject, message, recipients, template=None, context=None):
+    """
+    Render a notification once and send it to every recipient over one connection.
+
+    If a send fails, the retry only goes to the recipients not reached yet.
+
+    Args:
+        context: dict of name -> {'model': app label.Model, 'pk': pk}, see enqueue_email
+    """
+    from django.apps import apps
+    from django.template import TemplateDoesNotExist
+    from django.template.loader import render_to_string
+    from .email_utils import BulkEmailFailed, send_bulk_email
+
+    html_message = message
+    if template:
+        objects = {
+            name: apps.get_model(ref['model'])._default_manager.get(pk=ref['pk'])
+            for name, ref in (context or {}).items()
+        }
+        try:
+            html_message = render_to_string(template, objects)
+        except TemplateDoesNotExist:
+            logger.warning(f"Email template {template} not found, sending plain message")
+
+    try:
+        send_bulk_email(subject, message, recipients, html_content=html_message)
+    except BulkEmailFailed as e:
+        raise SendFailed(f"Notification email failed: {e}", payload={'recipients': e.unsent})
+
+
+HANDLERS = {
+    'order_confirmation_sms': send_order_confirmation_sms,
+    'order_confirmation_email': send_order_confirmation_email,
+    'restaurant_notification_email': send_restaurant_notification_email,
+    'payment_confirmation_emails': send_payment_confirmation_emails,
+    'notification_emails': send_notification_emails,
+}
+
+
+def enqueue_email(subject, message, recipients, template=None, context=None):
+    """
+    Queue one email to many recipients for the outbox worker.
+
+    Template context values must be model instances; they are stored by
+    primary key and loaded again when the email is sent.
+    """
+    return enqueue(
+        'notification_emails',
+        subject=subject,
+        message=message,
+        recipients=[email for email in recipients if email],
+        template=template,
+        context={
+            name: {'model': instance._meta.label, 'pk': str(instance.pk)}
+            for name, instance in (context or {}).items()
+        }
+    )
+
+
+def claim_batch(batch_size=50, retry_after=timedelta(minutes=1), stale_after=timedelta(minutes=10)):
+    """
+    Claim up to batch_size pending messages for this worker.
+
+    Rows are locked with SKIP LOCKED so several workers can drain the outbox
+    concurrently, and the claim transaction is kept short so no lock is held
+    while handlers talk to external services. Failed messages are retried
+    once retry_after has passed, and messages left in 'processing' by a
+    worker that died longer than stale_after ago are claimed again.
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        batch = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True).filter(
+                Q(status='pending', claimed_at__isnull=True) |
+                Q(status='pending', claimed_at__lt=now - retry_after) |
+                Q(status='processing', claimed_at__lt=now - stale_after)
+            ).order_by('created_at')[:batch_size]
+        )
+        if batch:
+            OutboxMessage.objects.filter(pk__in=[message.pk for message in batch]).update(
+                status='processing',
+                claimed_at=now,
+                attempts=F('attempts') + 1
+            )
+
+    for message in batch:
+        message.attempts += 1
+    return batch
+
+
+def process_batch(batch, max_attempts=5):
+    """
+    Run the handler of each claimed message and record the outcome.
+
+    Returns:
+        tuple: (sent count, failed count)
+    """
+    sent_ids = []
+    failed = []
+
+    for message in batch:
+        try:
+            HANDLERS[message.event_type](**message.payload)
+            sent_ids.append(message.pk)
+        except Exception as e:
+            logger.error(f"Outbox message {message.pk} ({message.event_type}) failed: {e}")
+            message.status = 'failed' if message.attempts >= max_attempts else 'pending'
+            message.last_error = str(e)
+            if isinstance(e, SendFailed) and e.payload:
+                message.payload = {**message.payload, **e.payload}
+            failed.append(message)
+
+    if sent_ids:
+        OutboxMessage.objects.filter(pk__in=sent_ids).update(
+            status='sent',
+            processed_at=timezone.now(),
+            last_error=''
+        )
+    if failed:
+        OutboxMessage.objects.bulk_update(failed, ['status', 'last_error', 'payload'])
+
+    return len(sent_ids), len(failed)
@@ -0,0 +1,158 @@
+from django.db.models import Q
+from django.http import Http404
+from datetime import datetime
+import base64
+import json
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def encode_cursor(value, pk, direction):
+    """Pack a (timestamp, pk) position and direction into an opaque URL-safe token"""
+    raw = json.dumps({'t': value.isoformat(), 'id': str(pk), 'd': direction})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Unpack a token created by encode_cursor.
+
+    Returns:
+        tuple: (timestamp, pk as str, direction)
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        direction = data['d']
+        if direction not in ('next', 'prev'):
+            raise ValueError(direction)
+        return datetime.fromisoformat(data['t']), data['id'], direction
+    except Exception:
+        raise InvalidCursor(f"Invalid cursor: {token}")
+
+
+class CursorPage:
+    """One page of a CursorPaginator, newest first"""
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class CursorPaginator:
+    """
+    Keyset paginator over (timestamp field, primary key), newest first.
+
+    Unlike Django's Paginator it never runs COUNT(*) or OFFSET: each page is
+    a range scan starting just past the cursor row, so page N costs the same
+    as page 1 provided (field, pk) is indexed. Works with model and values()
+    querysets; values() querysets must include the field and the pk.
+
+    Several querysets with the same field and pk type (e.g. a live table
+    and its archive) can be paginated as one list: each is read from the
+    same cursor and the results are merged.
+
+    Args:
+        queryset: QuerySet, or list of QuerySets, to paginate (any existing
+                  ordering is replaced)
+        per_page: int - Rows per page
+        field: str - Timestamp field to order by, e.g. 'created_at'
+    """
+
+    def __init__(self, queryset, per_page, field='created_at'):
+        self.querysets = list(queryset) if isinstance(queryset, (list, tuple)) else [queryset]
+        self.per_page = per_page
+        self.field = field
+        self.pk_name = self.querysets[0].model._meta.pk.attname
+
+    def _position(self, row):
+        if isinstance(row, dict):
+            return row[self.field], row[self.pk_name]
+        return getattr(row, self.field), getattr(row, self.pk_name)
+
+    def page(self, cursor=None):
+        """
+        Return the page after (or before) the given cursor.
+
+        Raises:
+            InvalidCursor: if the cursor token cannot be decoded
+        """
+        field, pk = self.field, self.pk_name
+        direction = 'next'
+        condition = Q()
+
+        if cursor:
+            value, cursor_pk, direction = decode_cursor(cursor)
+            if direction == 'next':
+                condition = Q(**{f'{field}__lt': value}) | Q(**{field: value, f'{pk}__lt': cursor_pk})
+            else:
+                condition = Q(**{f'{field}__gt': value}) | Q(**{field: value, f'{pk}__gt': cursor_pk})
+
+        if direction == 'next':
+            ordering = (f'-{field}', f'-{pk}')
+        else:
+            ordering = (field, pk)
+
+        # Fetch one extra row to learn whether there is anything beyond this page
+        rows = []
+        for queryset in self.querysets:
+            rows.extend(queryset.filter(condition).order_by(*ordering)[:self.per_page + 1])
+        if len(self.querysets) > 1:
+            rows.sort(key=self._position, reverse=(direction == 'next'))
+            rows = rows[:self.per_page + 1]
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if direction == 'next':
+            has_next, has_previous = has_more, bool(cursor)
+        else:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor(*self._position(rows[-1]), 'next')
+        if rows and has_previous:
+            previous_cursor = encode_cursor(*self._position(rows[0]), 'prev')
+
+        return CursorPage(rows, next_cursor, previous_cursor)
+
+
+class CursorPaginationMixin:
+    """
+    ListView mixin that swaps OFFSET pagination for CursorPaginator.
+
+    Reads the opaque token from ?cursor= and exposes page_obj with
+    has_next/has_previous and next_cursor/previous_cursor for templates.
+    Override get_cursor_querysets to page over more than one table.
+    """
+    cursor_field = 'created_at'
+
+    def get_cursor_querysets(self, queryset):
+        return [queryset]
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = CursorPaginator(self.get_cursor_querysets(queryset), page_size, field=self.cursor_field)
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidCursor:
+            raise Http404('Invalid page.')
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,176 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Events a slow subscriber may fall behind by before it is told to resync
+DEFAULT_QUEUE_SIZE = 100
+
+
+class Subscription:
+    """
+    One consumer's view of a set of channels.
+
+    Created inside a running event loop; events published from any thread
+    are handed to that loop, so the consumer just awaits get().
+    """
+
+    def __init__(self, broker, channels, maxsize=DEFAULT_QUEUE_SIZE):
+        self.broker = broker
+        self.channels = frozenset(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        # Set when events were dropped because the consumer fell behind
+        self.overflowed = False
+
+    def deliver(self, event):
+        """Queue an event for this subscriber; safe to call from any thread"""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The subscriber's loop has shut down
+            self.close()
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout=None):
+        """Next event; raises TimeoutError if none arrives within timeout seconds"""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InMemoryBroker:
+    """
+    In-process publish/subscribe.
+
+    Reaches subscribers in this process only, which is enough for a single
+    ASGI worker. Run several workers or nodes with a broker that relays
+    through a shared backend, such as RedisBroker, selected by the
+    EVENT_BROKER setting.
+    """
+
+    def __init__(self):
+        self.subscriptions = set()
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+
+    def subscribe(self, channels, maxsize=DEFAULT_QUEUE_SIZE):
+        subscription = Subscription(self, channels, maxsize)
+        with self.lock:
+            self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions.discard(subscription)
+
+    def make_event(self, channel, event_type, data):
+        return {
+            'id': f'{time.time_ns()}-{next(self.ids)}',
+            'channel': channel,
+            'type': event_type,
+            'data': data,
+        }
+
+    def publish(self, channel, event_type, data):
+        """Send an event to every subscriber of channel"""
+        self.deliver(self.make_event(channel, event_type, data))
+
+    def deliver(self, event):
+        """Fan an event out to this process's subscribers"""
+        with self.lock:
+            targets = [s for s in self.subscriptions if event['channel'] in s.channels]
+        for subscription in targets:
+            subscription.deliver(event)
+
+
+class RedisBroker(InMemoryBroker):
+    """
+    Publish/subscribe across processes and nodes through Redis.
+
+    Events are published to Redis; one listener thread per process relays
+    them to the local subscribers. Needs the redis package and REDIS_URL.
+    """
+
+    prefix = 'events:'
+
+    def __init__(self, url=None):
+        super().__init__()
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured('RedisBroker requires the redis package')
+        url = url or getattr(settings, 'REDIS_URL', '')
+        if not url:
+            raise ImproperlyConfigured('RedisBroker requires REDIS_URL')
+        self.client = redis.Redis.from_url(url)
+        self.listener = None
+
+    def publish(self, channel, event_type, data):
+        event = self.make_event(channel, event_type, data)
+        self.client.publish(self.prefix + channel, json.dumps(event, cls=DjangoJSONEncoder))
+
+    def subscribe(self, channels, maxsize=DEFAULT_QUEUE_SIZE):
+        with self.lock:
+            if self.listener is None:
+                self.listener = threading.Thread(target=self._listen, name='event-broker-listener', daemon=True)
+                self.listener.start()
+        return super().subscribe(channels, maxsize)
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(self.prefix + '*')
+                for message in pubsub.listen():
+                    self.deliver(json.loads(message['data']))
+            except Exception as e:
+                logger.error(f"Event broker listener error, reconnecting: {e}")
+                time.sleep(1)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The process-wide broker named by settings.EVENT_BROKER"""
+    global _broker
+
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                broker_class = import_string(getattr(settings, 'EVENT_BROKER', 'core.pubsub.InMemoryBroker'))
+                _broker = broker_class()
+    return _broker
+
+
+def publish_on_commit(channel, event_type, data):
+    """
+    Publish once the current transaction commits.
+
+    Subscribers react by reading the database, so they must not hear about
+    a change before it is visible, or about one that was rolled back.
+    """
+    def publish():
+        try:
+            get_broker().publish(channel, event_type, data)
+        except Exception as e:
+            logger.error(f"Error publishing {event_type} to {channel}: {e}")
+
+    transaction.on_commit(publish)
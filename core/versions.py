@@ -0,0 +1,94 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+import hashlib
+import json
+import uuid
+
+VERSION_KEY_PREFIX = 'change_version_'
+# Versions are only a cache; losing one just costs clients a full response
+VERSION_TTL = 24 * 3600
+# Cache backends that are private to one process
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared_cache():
+    """Whether every worker process reads and writes the same cache"""
+    return settings.CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+
+def get_version(name):
+    """Current change token for a feed, created on first use"""
+    return cache.get_or_set(VERSION_KEY_PREFIX + name, lambda: uuid.uuid4().hex[:12], VERSION_TTL)
+
+
+def bump_versions(*names):
+    """
+    Mark feeds as changed once the current transaction commits.
+
+    Bumping before commit would let a poll read the new token together with
+    the old rows and then answer 304 to every later poll.
+    """
+    keys = [VERSION_KEY_PREFIX + name for name in names]
+
+    def bump():
+        cache.set_many({key: uuid.uuid4().hex[:12] for key in keys}, VERSION_TTL)
+
+    transaction.on_commit(bump)
+
+
+def make_etag(name, *parts):
+    """
+    ETag for a response built from the given feed.
+
+    Versions need a cache every worker shares: with a per-process cache a
+    worker that did not see the bump would keep answering 304. Without one
+    there is no ETag and every poll gets the full response.
+
+    Args:
+        name: str - Feed name
+        parts: Anything else the response depends on, e.g. query parameters
+
+    Returns:
+        str, or None if the cache is not shared
+    """
+    if not is_shared_cache():
+        return None
+    tag = f'{name}-{get_version(name)}'
+    if parts:
+        tag += '-' + hashlib.md5(repr(parts).encode()).hexdigest()[:8]
+    return quote_etag(tag)
+
+
+def content_etag(name, data):
+    """
+    ETag from a response body itself, for small responses that are cheaper
+    to build than to track with a change version
+    """
+    digest = hashlib.md5(json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder).encode()).hexdigest()[:12]
+    return quote_etag(f'{name}-{digest}')
+
+
+def not_modified(request, etag):
+    """304 response if the client's If-None-Match matches etag, else None"""
+    if etag is None:
+        return None
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        set_etag(response, etag)
+    return response
+
+
+def set_etag(response, etag):
+    """Tag a response and make clients revalidate it on every poll"""
+    if etag is None:
+        return response
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Order, OrderItem
+from .models import Order, OrderItem, ArchivedOrder, ArchivedOrderItem
 
 
 class OrderItemInline(admin.TabularInline):
@@ -26,3 +26,22 @@ class OrderItemAdmin(admin.ModelAdmin):
     list_display = ('order', 'meal', 'quantity', 'price')
     list_filter = ('order__status', 'meal__restaurant')
     search_fields = ('order__id', 'meal__name')
+
+
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = ArchivedOrderItem
+    extra = 0
+    readonly_fields = ('meal', 'quantity', 'price')
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = ('order_number', 'customer', 'restaurant', 'status', 'total_amount', 'created_at', 'archived_at')
+    list_filter = ('status', 'archived_at')
+    search_fields = ('customer__username', 'restaurant__name', 'id')
+    readonly_fields = ('id', 'created_at', 'updated_at', 'archived_at', 'payment', 'restaurant_earning', 'delivery_assignments')
+    inlines = [ArchivedOrderItemInline]
+    
+    def order_number(self, obj):
+        return obj.order_number
+    order_number.short_description = 'Order #'
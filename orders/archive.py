@@ -0,0 +1,121 @@
+from django.db import transaction
+from django.db.models import F
+from contextvars import ContextVar
+
+from .models import Order, OrderItem, ArchivedOrder, ArchivedOrderItem, make_order_number
+
+CLOSED_STATUSES = ('delivered', 'cancelled')
+
+# True while archive_chunk deletes orders it has just copied, so post_delete
+# receivers can tell an archived order from one that was really deleted
+archiving = ContextVar('archiving_orders', default=False)
+
+ORDER_FIELDS = (
+    'id', 'order_number', 'customer_id', 'restaurant_id', 'status', 'total_amount', 'delivery_fee',
+    'tax_amount', 'grand_total', 'delivery_address', 'phone', 'notes',
+    'checkout_group', 'created_at', 'updated_at',
+)
+
+
+def snapshot(instance):
+    """Every concrete column of a model instance as a JSON-safe dict"""
+    return {
+        field.attname: field.value_to_string(instance)
+        for field in instance._meta.concrete_fields
+    }
+
+
+def archivable_orders(cutoff):
+    """
+    Closed orders created before cutoff that can leave the live table.
+
+    Orders whose restaurant earning has not been paid out yet stay live so
+    payouts keep seeing them.
+    """
+    return Order.objects.filter(
+        status__in=CLOSED_STATUSES,
+        created_at__lt=cutoff
+    ).exclude(
+        restaurant_earning__is_paid_out=False
+    )
+
+
+def archive_chunk(order_ids):
+    """
+    Move one chunk of orders and their items into the archive tables.
+
+    Runs in its own short transaction. Orders are locked and re-checked so a
+    row that changed since it was selected is left alone. The order's
+    payment, restaurant earning and delivery assignments are copied onto the
+    archived order as snapshots and also kept as live rows, re-pointed at the
+    archived order, as are the order's payout links.
+
+    Returns:
+        int: Number of orders archived
+    """
+    with transaction.atomic():
+        orders = list(
+            Order.objects.select_for_update().filter(
+                pk__in=order_ids,
+                status__in=CLOSED_STATUSES
+            ).order_by('pk')
+        )
+        if not orders:
+            return 0
+
+        ids = [order.pk for order in orders]
+
+        from payments.models import Payment
+        from restaurants.models_payment import RestaurantEarning, RestaurantPayout
+        from riders.models import DeliveryAssignment
+
+        payments = {p.order_id: snapshot(p) for p in Payment.objects.filter(order_id__in=ids)}
+        earnings = {e.order_id: snapshot(e) for e in RestaurantEarning.objects.filter(order_id__in=ids)}
+        assignments = {}
+        for assignment in DeliveryAssignment.objects.filter(order_id__in=ids).order_by('assigned_at'):
+            assignments.setdefault(assignment.order_id, []).append(snapshot(assignment))
+
+        for order in orders:
+            order.order_number = order.order_number or make_order_number(order.pk)
+
+        ArchivedOrder.objects.bulk_create([
+            ArchivedOrder(
+                **{name: getattr(order, name) for name in ORDER_FIELDS},
+                payment=payments.get(order.pk),
+                restaurant_earning=earnings.get(order.pk),
+                delivery_assignments=assignments.get(order.pk, [])
+            )
+            for order in orders
+        ])
+        ArchivedOrderItem.objects.bulk_create([
+            ArchivedOrderItem(
+                order_id=item.order_id,
+                meal_id=item.meal_id,
+                quantity=item.quantity,
+                price=item.price
+            )
+            for item in OrderItem.objects.filter(order_id__in=ids).order_by('pk')
+        ])
+
+        # Financial and delivery rows stay, pointing at the archived copy;
+        # deleting the order then only clears their order column
+        Payment.objects.filter(order_id__in=ids).update(archived_order_id=F('order_id'))
+        RestaurantEarning.objects.filter(order_id__in=ids).update(archived_order_id=F('order_id'))
+        DeliveryAssignment.objects.filter(order_id__in=ids).update(archived_order_id=F('order_id'))
+        payout_links = RestaurantPayout.orders.through.objects.filter(order_id__in=ids)
+        RestaurantPayout.archived_orders.through.objects.bulk_create([
+            RestaurantPayout.archived_orders.through(
+                restaurantpayout_id=link.restaurantpayout_id,
+                archivedorder_id=link.order_id
+            )
+            for link in payout_links
+        ])
+
+        # Cascades to the items copied above
+        token = archiving.set(True)
+        try:
+            Order.objects.filter(pk__in=ids).delete()
+        finally:
+            archiving.reset(token)
+
+    return len(orders)
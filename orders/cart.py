@@ -0,0 +1,51 @@
+from decimal import Decimal
+
+from meals.models import Meal
+
+
+def price_cart(cart, queryset=None):
+    """
+    Price a session cart with a single query.
+
+    Args:
+        cart: dict - Session cart mapping meal id (as str) to quantity
+        queryset: QuerySet - Optional Meal queryset to resolve lines against
+                  (e.g. one with select_for_update() applied)
+
+    Returns:
+        dict: 'items' (list of {'meal', 'quantity', 'total'} in cart order),
+              'total' (Decimal) and 'count' (total quantity).
+              Meals that no longer exist or are unavailable are dropped.
+    """
+    meal_ids = [meal_id for meal_id in cart if str(meal_id).isdigit()]
+
+    if queryset is None:
+        queryset = Meal.objects.select_related('restaurant')
+
+    meals = {}
+    if meal_ids:
+        meals = queryset.filter(is_available=True).in_bulk(meal_ids)
+
+    cart_items = []
+    total = Decimal('0.00')
+    count = 0
+
+    for meal_id, quantity in cart.items():
+        meal = meals.get(int(meal_id)) if str(meal_id).isdigit() else None
+        if meal is None:
+            continue
+
+        item_total = meal.price * quantity
+        cart_items.append({
+            'meal': meal,
+            'quantity': quantity,
+            'total': item_total
+        })
+        total += item_total
+        count += quantity
+
+    return {
+        'items': cart_items,
+        'total': total,
+        'count': count,
+    }
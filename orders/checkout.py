@@ -0,0 +1,81 @@
+from decimal import Decimal
+import uuid
+
+from core.utils import get_delivery_fee, get_tax_rate
+from meals.models import Meal
+from superadmin import metrics
+from .cart import price_cart
+from .models import Order, OrderItem, make_order_number
+
+
+def place_orders(customer, cart, details):
+    """
+    Create one order per restaurant from a session cart.
+
+    Must run inside transaction.atomic(). The cart's meals are loaded once
+    with row locks so prices cannot change mid-checkout, lines are grouped
+    by restaurant and totalled in memory, and all orders and all order items
+    are each written with a single bulk insert. Delivery fee, tax and grand
+    total are snapshotted on every order from the current settings. As
+    bulk_create sends no post_save, the orders are counted in the daily
+    metrics here, once the transaction commits.
+
+    Args:
+        customer: User placing the order
+        cart: dict - Session cart mapping meal id (as str) to quantity
+        details: Order - Unsaved order carrying the delivery address, phone
+                 and notes shared by every order in the checkout
+
+    Returns:
+        tuple: (checkout group id, list of saved orders), or (None, []) if
+               no cart line is still available
+    """
+    summary = price_cart(
+        cart,
+        queryset=Meal.objects.select_for_update().order_by('pk')
+    )
+    if not summary['items']:
+        return None, []
+
+    # Group lines by restaurant, keeping the order restaurants appear in the cart
+    lines_by_restaurant = {}
+    for item in summary['items']:
+        lines_by_restaurant.setdefault(item['meal'].restaurant_id, []).append(item)
+
+    checkout_group = uuid.uuid4()
+    delivery_fee = get_delivery_fee()
+    tax_rate = get_tax_rate()
+    orders = []
+    order_items = []
+
+    for restaurant_id, lines in lines_by_restaurant.items():
+        order = Order(
+            customer=customer,
+            restaurant_id=restaurant_id,
+            total_amount=sum((item['total'] for item in lines), Decimal('0.00')),
+            delivery_address=details.delivery_address,
+            phone=details.phone,
+            notes=details.notes,
+            checkout_group=checkout_group
+        )
+        # bulk_create skips save(), so number the order here
+        order.order_number = make_order_number(order.id)
+        order.apply_charges(delivery_fee, tax_rate)
+        orders.append(order)
+        order_items.extend(
+            OrderItem(
+                order=order,
+                meal=item['meal'],
+                quantity=item['quantity'],
+                price=item['meal'].price
+            )
+            for item in lines
+        )
+
+    Order.objects.bulk_create(orders)
+    OrderItem.objects.bulk_create(order_items)
+
+    for order in orders:
+        metrics.order_saved(order, None, created=True)
+
+    return checkout_group, orders
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from datetime import timedelta
+import time
+
+from orders.archive import archivable_orders, archive_chunk
+
+
+class Command(BaseCommand):
+    help = 'Move delivered and cancelled orders older than N days, with their items, into the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=180,
+            help='Archive closed orders created more than this many days ago'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of orders moved per transaction'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.0,
+            help='Seconds to pause between batches to ease load on the live tables'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many orders would be archived'
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        candidates = archivable_orders(cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f'{candidates.count()} orders created before {cutoff:%Y-%m-%d} would be archived')
+            return
+
+        archived = 0
+        last_pk = None
+
+        while True:
+            # Walk the primary key so batches never rescan rows already handled
+            queryset = candidates.order_by('pk')
+            if last_pk is not None:
+                queryset = queryset.filter(pk__gt=last_pk)
+            order_ids = list(queryset.values_list('pk', flat=True)[:options['batch_size']])
+            if not order_ids:
+                break
+
+            archived += archive_chunk(order_ids)
+            last_pk = order_ids[-1]
+            self.stdout.write(f'Archived {archived} orders...')
+
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f'Archive complete: {archived} orders moved'))
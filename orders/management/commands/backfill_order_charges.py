@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from decimal import Decimal
+
+from core.utils import get_delivery_fee, get_tax_rate
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Backfill delivery fee, tax and grand total on orders created before they were stored'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of orders updated per transaction'
+        )
+        parser.add_argument(
+            '--delivery-fee',
+            type=str,
+            help='Delivery fee to apply (defaults to the current system setting)'
+        )
+        parser.add_argument(
+            '--tax-rate',
+            type=str,
+            help='Tax rate percentage to apply (defaults to the current system setting)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        delivery_fee = Decimal(options['delivery_fee']) if options['delivery_fee'] else get_delivery_fee()
+        tax_rate = Decimal(options['tax_rate']) if options['tax_rate'] else get_tax_rate()
+
+        self.stdout.write(f'Backfilling with delivery fee KES {delivery_fee} and tax rate {tax_rate}%')
+
+        updated = 0
+        last_pk = None
+
+        while True:
+            # Walk the primary key so each batch is an index range, not an OFFSET scan
+            queryset = Order.objects.filter(grand_total__isnull=True).order_by('pk')
+            if last_pk is not None:
+                queryset = queryset.filter(pk__gt=last_pk)
+            batch = list(queryset.only('pk', 'total_amount')[:batch_size])
+            if not batch:
+                break
+
+            for order in batch:
+                order.apply_charges(delivery_fee, tax_rate)
+
+            with transaction.atomic():
+                Order.objects.bulk_update(batch, ['delivery_fee', 'tax_amount', 'grand_total'])
+
+            updated += len(batch)
+            last_pk = batch[-1].pk
+            self.stdout.write(f'Updated {updated} orders...')
+
+        self.stdout.write(self.style.SUCCESS(f'Backfill complete: {updated} orders updated'))
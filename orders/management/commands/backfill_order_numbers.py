@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from orders.models import Order, ArchivedOrder, make_order_number
+
+
+class Command(BaseCommand):
+    help = 'Fill in the stored order_number on live and archived orders created before it existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of orders updated per transaction'
+        )
+
+    def handle(self, *args, **options):
+        for model in (Order, ArchivedOrder):
+            updated = self.backfill(model, options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'{model.__name__}: {updated} order numbers filled in'))
+
+    def backfill(self, model, batch_size):
+        updated = 0
+        last_pk = None
+
+        while True:
+            # Walk the primary key so each batch is an index range, not an OFFSET scan
+            queryset = model.objects.filter(order_number='').order_by('pk')
+            if last_pk is not None:
+                queryset = queryset.filter(pk__gt=last_pk)
+            batch = list(queryset.only('pk')[:batch_size])
+            if not batch:
+                break
+
+            for order in batch:
+                order.order_number = make_order_number(order.pk)
+
+            with transaction.atomic():
+                model.objects.bulk_update(batch, ['order_number'])
+
+            updated += len(batch)
+            last_pk = batch[-1].pk
+            self.stdout.write(f'{model.__name__}: updated {updated}...')
+
+        return updated
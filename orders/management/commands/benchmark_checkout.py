@@ -0,0 +1,89 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from decimal import Decimal
+import time
+
+from meals.models import Meal
+from orders.checkout import place_orders
+from orders.models import Order, OrderItem
+
+User = get_user_model()
+
+
+def legacy_checkout(customer, cart, order):
+    """Per-line checkout as it worked before place_orders, kept for comparison"""
+    first_meal = Meal.objects.get(id=list(cart.keys())[0])
+    order.customer = customer
+    order.restaurant = first_meal.restaurant
+
+    total = Decimal('0.00')
+    for meal_id, quantity in cart.items():
+        meal = Meal.objects.get(id=meal_id, is_available=True)
+        total += meal.price * quantity
+
+    order.total_amount = total
+    order.save()
+
+    for meal_id, quantity in cart.items():
+        meal = Meal.objects.get(id=meal_id, is_available=True)
+        OrderItem.objects.create(order=order, meal=meal, quantity=quantity, price=meal.price)
+
+    return order
+
+
+class Command(BaseCommand):
+    help = 'Compare query count and latency of the legacy and bulk checkout pipelines (changes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[1, 5, 10, 20],
+            help='Cart sizes (number of distinct meals) to benchmark'
+        )
+        parser.add_argument(
+            '--username',
+            type=str,
+            help='Customer to place the benchmark orders as (defaults to the first user)'
+        )
+
+    def handle(self, *args, **options):
+        customer = (
+            User.objects.filter(username=options['username']).first()
+            if options['username'] else User.objects.order_by('pk').first()
+        )
+        if customer is None:
+            raise CommandError('No user found to place benchmark orders as')
+
+        meal_ids = list(
+            Meal.objects.filter(is_available=True).order_by('pk').values_list('pk', flat=True)[:max(options['sizes'])]
+        )
+        if not meal_ids:
+            raise CommandError('No available meals to build a cart from')
+
+        self.stdout.write(f"{'lines':>6} {'legacy queries':>15} {'bulk queries':>13} {'legacy ms':>10} {'bulk ms':>8}")
+
+        for size in options['sizes']:
+            cart = {str(meal_id): 1 for meal_id in meal_ids[:size]}
+            legacy_queries, legacy_ms = self._measure(legacy_checkout, customer, cart)
+            bulk_queries, bulk_ms = self._measure(place_orders, customer, cart)
+            self.stdout.write(
+                f"{len(cart):>6} {legacy_queries:>15} {bulk_queries:>13} {legacy_ms:>10.1f} {bulk_ms:>8.1f}"
+            )
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete, no orders were kept.'))
+
+    def _measure(self, pipeline, customer, cart):
+        """Run one checkout pipeline in a rolled back transaction"""
+        with transaction.atomic():
+            order = Order(delivery_address='Benchmark address', phone='0700000000')
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                pipeline(customer, cart, order)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+            transaction.set_rollback(True)
+
+        return len(queries), elapsed_ms
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 02:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='checkout_group',
+            field=models.UUIDField(blank=True, db_index=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.0.14 on 2026-10-17 02:33
+
+import django.db.models.deletion
+import orders.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meals', '0001_initial'),
+        ('orders', '0004_order_composite_indexes'),
+        ('restaurants', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('preparing', 'Preparing'), ('ready', 'Ready for Pickup'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('delivery_fee', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('tax_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('grand_total', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('delivery_address', models.TextField()),
+                ('phone', models.CharField(max_length=15)),
+                ('notes', models.TextField(blank=True)),
+                ('checkout_group', models.UUIDField(blank=True, editable=False, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('payment', models.JSONField(blank=True, null=True)),
+                ('restaurant_earning', models.JSONField(blank=True, null=True)),
+                ('delivery_assignments', models.JSONField(blank=True, default=list)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_orders', to=settings.AUTH_USER_MODEL)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_orders', to='restaurants.restaurant')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+            bases=(orders.models.OrderChargesMixin, models.Model),
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('meal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='meals.meal')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='orders.archivedorder')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['customer', 'created_at'], name='archorder_cust_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['restaurant', 'created_at'], name='archorder_rest_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['status', 'created_at'], name='archorder_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['created_at'], name='archorder_created_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-17 02:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_archived_orders'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedorder',
+            name='order_number',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=8),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='order_number',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=8),
+        ),
+    ]
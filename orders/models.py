@@ -3,10 +3,71 @@ from django.conf import settings
 from django.urls import reverse
 from restaurants.models import Restaurant
 from meals.models import Meal
+from decimal import Decimal
 import uuid
 
+ORDER_NUMBER_LENGTH = 8
+ORDER_NUMBER_CHARS = '0123456789ABCDEF'
 
-class Order(models.Model):
+
+def make_order_number(order_id):
+    """Customer-facing order number: the first 8 hex digits of the order id"""
+    return order_id.hex[:ORDER_NUMBER_LENGTH].upper()
+
+
+def order_number_q(value, field='order_number'):
+    """
+    Q matching order numbers equal to, or starting with, value.
+
+    Prefixes are matched as a range on the indexed column rather than with
+    LIKE, so the lookup uses the index on every database and collation.
+
+    Args:
+        value: str - Full or partial order number, with or without a leading '#'
+        field: str - Lookup path to the order number, e.g. 'order__order_number'
+
+    Returns:
+        Q, or None if value cannot be (part of) an order number
+    """
+    number = value.strip().lstrip('#').upper()
+    if not number or len(number) > ORDER_NUMBER_LENGTH:
+        return None
+    if any(char not in ORDER_NUMBER_CHARS for char in number):
+        return None
+    if len(number) == ORDER_NUMBER_LENGTH:
+        return models.Q(**{field: number})
+    return models.Q(**{
+        f'{field}__gte': number,
+        f'{field}__lte': number + 'F' * (ORDER_NUMBER_LENGTH - len(number)),
+    })
+
+
+class OrderChargesMixin:
+    """Order number and charge helpers shared by Order and ArchivedOrder"""
+    
+    def save(self, *args, **kwargs):
+        if not self.order_number:
+            self.order_number = make_order_number(self.id)
+        super().save(*args, **kwargs)
+    
+    def apply_charges(self, delivery_fee, tax_rate):
+        """Snapshot delivery fee, tax and grand total (tax_rate is a percentage)"""
+        self.delivery_fee = delivery_fee
+        self.tax_amount = (
+            (self.total_amount + delivery_fee) * tax_rate / Decimal('100')
+        ).quantize(Decimal('0.01'))
+        self.grand_total = self.total_amount + delivery_fee + self.tax_amount
+        return self
+    
+    def ensure_charges(self):
+        """Fill in charges from current settings for orders not yet backfilled (not saved)"""
+        if self.grand_total is None:
+            from core.utils import get_delivery_fee, get_tax_rate
+            self.apply_charges(get_delivery_fee(), get_tax_rate())
+        return self
+
+
+class Order(OrderChargesMixin, models.Model):
     STATUS_CHOICES = (
         ('pending', 'Pending'),
         ('confirmed', 'Confirmed'),
@@ -17,18 +78,35 @@ class Order(models.Model):
     )
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    order_number = models.CharField(max_length=ORDER_NUMBER_LENGTH, blank=True, db_index=True, editable=False)
     customer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='orders')
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='orders')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    # Charges snapshotted at checkout so later settings changes don't alter old orders
+    delivery_fee = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    tax_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    grand_total = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     delivery_address = models.TextField()
     phone = models.CharField(max_length=15)
     notes = models.TextField(blank=True)
+    checkout_group = models.UUIDField(null=True, blank=True, db_index=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Restaurant dashboards and printable lists (restaurant + status, oldest first)
+            models.Index(fields=['restaurant', 'status', 'created_at'], name='order_rest_status_created_idx'),
+            # Restaurant and customer order lists, paginated on (created_at, id)
+            models.Index(fields=['restaurant', 'created_at'], name='order_rest_created_idx'),
+            models.Index(fields=['customer', 'created_at'], name='order_cust_created_idx'),
+            # Rider available orders and the superadmin status filter
+            models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+            # Unfiltered superadmin order list
+            models.Index(fields=['created_at'], name='order_created_idx'),
+        ]
     
     def __str__(self):
         return f"Order {self.id} - {self.customer.username}"
@@ -36,9 +114,11 @@ class Order(models.Model):
     def get_absolute_url(self):
         return reverse('orders:detail', kwargs={'pk': self.pk})
     
-    @property
-    def order_number(self):
-        return str(self.id)[:8].upper()
+    def get_checkout_orders(self):
+        """Orders placed in the same checkout as this one, including itself"""
+        if not self.checkout_group:
+            return Order.objects.filter(pk=self.pk)
+        return Order.objects.filter(checkout_group=self.checkout_group, customer_id=self.customer_id)
 
 
 class OrderItem(models.Model):
@@ -53,3 +133,64 @@ class OrderItem(models.Model):
     @property
     def total_price(self):
         return self.quantity * self.price
+
+
+class ArchivedOrder(OrderChargesMixin, models.Model):
+    """
+    Closed order moved out of the live Order table by archive_orders.
+
+    Keeps the same id and columns as Order. The payment, restaurant earning
+    and delivery assignments that referenced the order are kept as JSON
+    snapshots, and their live rows are re-pointed here (kept_payment,
+    kept_earning, kept_assignments) along with the order's payout links.
+    """
+    STATUS_CHOICES = Order.STATUS_CHOICES
+    
+    id = models.UUIDField(primary_key=True, editable=False)
+    order_number = models.CharField(max_length=ORDER_NUMBER_LENGTH, blank=True, db_index=True, editable=False)
+    customer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_orders')
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='archived_orders')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    delivery_fee = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    tax_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    grand_total = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    delivery_address = models.TextField()
+    phone = models.CharField(max_length=15)
+    notes = models.TextField(blank=True)
+    checkout_group = models.UUIDField(null=True, blank=True, editable=False)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    payment = models.JSONField(null=True, blank=True)
+    restaurant_earning = models.JSONField(null=True, blank=True)
+    delivery_assignments = models.JSONField(default=list, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['customer', 'created_at'], name='archorder_cust_created_idx'),
+            models.Index(fields=['restaurant', 'created_at'], name='archorder_rest_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='archorder_status_created_idx'),
+            models.Index(fields=['created_at'], name='archorder_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Archived order {self.id} - {self.customer.username}"
+    
+    def get_absolute_url(self):
+        return reverse('orders:detail', kwargs={'pk': self.pk})
+
+
+class ArchivedOrderItem(models.Model):
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='items')
+    meal = models.ForeignKey(Meal, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=1)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    
+    def __str__(self):
+        return f"{self.quantity}x {self.meal.name}"
+    
+    @property
+    def total_price(self):
+        return self.quantity * self.price
@@ -2,24 +2,25 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.views.generic import ListView, DetailView, CreateView, TemplateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
 from django.contrib import messages
 from django.db import transaction
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404
 from decimal import Decimal
 import logging
-from .models import Order, OrderItem
+import uuid
+from .models import Order, ArchivedOrder
 from .forms import OrderForm
+from .cart import price_cart
+from .checkout import place_orders
 from meals.models import Meal
-
-# Import SMS service
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from sms_service import sms_service
+from core import outbox
+from core.idempotency import idempotent, IDEMPOTENCY_FIELD
+from core.pagination import CursorPaginationMixin
 
 logger = logging.getLogger(__name__)
 
-class OrderListView(LoginRequiredMixin, ListView):
+class OrderListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = Order
     template_name = 'orders/list.html'
     context_object_name = 'orders'
@@ -31,6 +32,17 @@ class OrderListView(LoginRequiredMixin, ListView):
             return Order.objects.filter(restaurant=user.restaurant)
         else:
             return Order.objects.filter(customer=user)
+    
+    def get_archived_queryset(self):
+        user = self.request.user
+        if user.is_restaurant:
+            return ArchivedOrder.objects.filter(restaurant=user.restaurant)
+        else:
+            return ArchivedOrder.objects.filter(customer=user)
+    
+    def get_cursor_querysets(self, queryset):
+        # Older closed orders live in the archive; page through both as one list
+        return [queryset, self.get_archived_queryset()]
 
 
 class OrderDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
@@ -38,6 +50,13 @@ class OrderDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
     template_name = 'orders/detail.html'
     context_object_name = 'order'
     
+    def get_object(self, queryset=None):
+        # Closed orders may have been moved to the archive by archive_orders
+        try:
+            return super().get_object(queryset)
+        except Http404:
+            return super().get_object(ArchivedOrder.objects.all())
+    
     def test_func(self):
         order = self.get_object()
         user = self.request.user
@@ -45,18 +64,12 @@ class OrderDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        order = self.get_object()
+        order = self.object.ensure_charges()
         
-        # Calculate order totals
-        subtotal = order.total_amount
-        delivery_fee = Decimal('50.00')
-        subtotal_with_delivery = subtotal + delivery_fee
-        tax_amount = subtotal_with_delivery * Decimal('0.08')
-        final_total = subtotal_with_delivery + tax_amount
-        
-        context['delivery_fee'] = delivery_fee
-        context['tax_amount'] = tax_amount
-        context['final_total'] = final_total
+        # Charges were snapshotted when the order was placed
+        context['delivery_fee'] = order.delivery_fee
+        context['tax_amount'] = order.tax_amount
+        context['final_total'] = order.grand_total
         
         return context
 
@@ -66,25 +79,10 @@ class CartView(LoginRequiredMixin, TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        cart = self.request.session.get('cart', {})
-        cart_items = []
-        total = Decimal('0.00')
+        summary = price_cart(self.request.session.get('cart', {}))
         
-        for meal_id, quantity in cart.items():
-            try:
-                meal = Meal.objects.get(id=meal_id, is_available=True)
-                item_total = meal.price * quantity
-                cart_items.append({
-                    'meal': meal,
-                    'quantity': quantity,
-                    'total': item_total
-                })
-                total += item_total
-            except Meal.DoesNotExist:
-                pass
-        
-        context['cart_items'] = cart_items
-        context['total'] = total
+        context['cart_items'] = summary['items']
+        context['total'] = summary['total']
         return context
 
 
@@ -132,15 +130,9 @@ class UpdateCartView(LoginRequiredMixin, View):
             request.session.modified = True
             
             # Calculate new totals
-            cart_total = Decimal('0.00')
-            cart_count = 0
-            for mid, qty in cart.items():
-                try:
-                    m = Meal.objects.get(id=mid, is_available=True)
-                    cart_total += m.price * qty
-                    cart_count += qty
-                except Meal.DoesNotExist:
-                    pass
+            summary = price_cart(cart)
+            cart_total = summary['total']
+            cart_count = summary['count']
             
             item_quantity = cart.get(meal_id_str, 0)
             item_total = meal.price * item_quantity if item_quantity > 0 else Decimal('0.00')
@@ -177,15 +169,9 @@ class RemoveFromCartView(LoginRequiredMixin, View):
                 request.session.modified = True
                 
                 # Calculate new totals
-                cart_total = Decimal('0.00')
-                cart_count = 0
-                for mid, qty in cart.items():
-                    try:
-                        m = Meal.objects.get(id=mid, is_available=True)
-                        cart_total += m.price * qty
-                        cart_count += qty
-                    except Meal.DoesNotExist:
-                        pass
+                summary = price_cart(cart)
+                cart_total = summary['total']
+                cart_count = summary['count']
                 
                 logger.info(f'Removed meal {meal_id} from cart for user {request.user.username}')
                 
@@ -209,6 +195,7 @@ class RemoveFromCartView(LoginRequiredMixin, View):
             }, status=400)
 
 
+@method_decorator(idempotent('checkout'), name='post')
 class OrderCreateView(LoginRequiredMixin, CreateView):
     model = Order
     form_class = OrderForm
@@ -217,25 +204,13 @@ class OrderCreateView(LoginRequiredMixin, CreateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        cart = self.request.session.get('cart', {})
-        cart_items = []
-        total = Decimal('0.00')
-        
-        for meal_id, quantity in cart.items():
-            try:
-                meal = Meal.objects.get(id=meal_id, is_available=True)
-                item_total = meal.price * quantity
-                cart_items.append({
-                    'meal': meal,
-                    'quantity': quantity,
-                    'total': item_total
-                })
-                total += item_total
-            except Meal.DoesNotExist:
-                pass
+        summary = price_cart(self.request.session.get('cart', {}))
         
-        context['cart_items'] = cart_items
-        context['total'] = total
+        context['cart_items'] = summary['items']
+        context['total'] = summary['total']
+        # A double-submitted form reuses this key, so the second post replays the first
+        context['idempotency_field'] = IDEMPOTENCY_FIELD
+        context['idempotency_key'] = uuid.uuid4().hex
         return context
     
     def form_valid(self, form):
@@ -245,44 +220,25 @@ class OrderCreateView(LoginRequiredMixin, CreateView):
             return redirect('orders:cart')
         
         with transaction.atomic():
-            # Get the first meal's restaurant (assuming single restaurant per order)
-            first_meal_id = list(cart.keys())[0]
-            first_meal = Meal.objects.get(id=first_meal_id)
-            
-            form.instance.customer = self.request.user
-            form.instance.restaurant = first_meal.restaurant
-            
-            # Calculate total
-            total = Decimal('0.00')
-            for meal_id, quantity in cart.items():
-                meal = Meal.objects.get(id=meal_id, is_available=True)
-                total += meal.price * quantity
-            
-            form.instance.total_amount = total
-            order = form.save()
-            
-            # Create order items
-            for meal_id, quantity in cart.items():
-                meal = Meal.objects.get(id=meal_id, is_available=True)
-                OrderItem.objects.create(
-                    order=order,
-                    meal=meal,
-                    quantity=quantity,
-                    price=meal.price
-                )
+            checkout_group, orders = place_orders(self.request.user, cart, form.instance)
+            if not orders:
+                messages.error(self.request, 'None of the meals in your cart are available anymore.')
+                return redirect('orders:cart')
             
             # Clear cart
             del self.request.session['cart']
             
-            # Send order confirmation SMS
-            try:
-                sms_service.send_order_confirmation(order)
-                logger.info(f"Order confirmation SMS sent for order {order.order_number}")
-            except Exception as e:
-                logger.error(f"Failed to send order confirmation SMS: {e}")
-            
-            messages.success(self.request, f'Order #{order.order_number} created successfully! Please complete payment.')
-            return redirect('payments:process_payment', order_id=order.pk)
+            # Queue the confirmation SMS; process_outbox sends it after commit
+            outbox.enqueue_many('order_confirmation_sms', [
+                {'order_id': str(order.pk)} for order in orders
+            ])
+        
+        order_numbers = ', '.join(f'#{order.order_number}' for order in orders)
+        if len(orders) > 1:
+            messages.success(self.request, f'Orders {order_numbers} created successfully, one per restaurant! Please complete payment.')
+        else:
+            messages.success(self.request, f'Order {order_numbers} created successfully! Please complete payment.')
+        return redirect('payments:process_payment', order_id=orders[0].pk)
 
 
 class UpdateOrderStatusView(LoginRequiredMixin, UserPassesTestMixin, View):
@@ -25,11 +25,15 @@ class Payment(models.Model):
     )
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name='payment')
+    # Archived orders leave the live table; the payment then points at the archived copy
+    order = models.OneToOneField(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='payment')
+    archived_order = models.OneToOneField(
+        'orders.ArchivedOrder', on_delete=models.SET_NULL, null=True, blank=True, related_name='kept_payment'
+    )
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     
     # Paystack fields
-    paystack_reference = models.CharField(max_length=200, blank=True, null=True)
+    paystack_reference = models.CharField(max_length=200, blank=True, null=True, db_index=True)
     paystack_transaction_id = models.CharField(max_length=200, blank=True, null=True)
     
     # Payment details
@@ -51,7 +55,8 @@ class Payment(models.Model):
         ordering = ['-created_at']
     
     def __str__(self):
-        return f"Payment {self.id} - {self.order.order_number} - KES{self.amount}"
+        order = self.order or self.archived_order
+        return f"Payment {self.id} - {order.order_number if order else ''} - KES{self.amount}"
     
     @property
     def is_successful(self):
@@ -7,6 +7,7 @@ from django.utils.decorators import method_decorator
 from django.contrib import messages
 from django.conf import settings
 from django.utils import timezone
+from django.db import transaction
 from decimal import Decimal
 import json
 import logging
@@ -15,7 +16,8 @@ import uuid
 
 from .models import Payment
 from orders.models import Order
-from core.email_utils import send_order_confirmation_email, send_restaurant_notification_email
+from core import outbox
+from core.idempotency import idempotent
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +45,7 @@ class PaystackKeyTestView(LoginRequiredMixin, View):
             return JsonResponse({'error': str(e)}, status=500)
 
 
+@method_decorator(idempotent('payment_intent'), name='post')
 class CreatePaymentIntentView(LoginRequiredMixin, View):
     """Create Paystack transaction for the order"""
     
@@ -54,27 +57,34 @@ class CreatePaymentIntentView(LoginRequiredMixin, View):
             
             order = get_object_or_404(Order, id=order_id, customer=request.user)
             
-            # Calculate total amount including tax and delivery fee using database settings
-            from core.utils import get_delivery_fee, get_tax_rate
+            # Orders split per restaurant at checkout are paid in one transaction
+            orders = list(
+                order.get_checkout_orders().exclude(payment__status='succeeded').order_by('pk')
+            )
+            if not orders:
+                return JsonResponse({'error': 'This order has already been paid.'}, status=400)
             
-            subtotal = order.total_amount
-            delivery_fee = get_delivery_fee()
-            tax_rate = get_tax_rate() / Decimal('100')  # Convert percentage to decimal
-            total_amount = (subtotal + delivery_fee) * (1 + tax_rate)
+            # Total including tax and delivery fee as snapshotted at checkout
+            order_totals = {o.pk: o.ensure_charges().grand_total for o in orders}
+            total_amount = sum(order_totals.values(), Decimal('0.00'))
             
             # Convert to kobo (Paystack uses kobo for NGN, but we'll use KES cents)
             amount_in_kobo = int(total_amount * 100)
             
-            # Create or get existing payment
-            payment, created = Payment.objects.get_or_create(
-                order=order,
-                defaults={
-                    'user': request.user,
-                    'amount': total_amount,
-                    'status': 'pending',
-                    'payment_method': payment_method_type
-                }
-            )
+            # Create missing payments in one insert, one payment per order
+            payments = {p.order_id: p for p in Payment.objects.filter(order__in=orders)}
+            Payment.objects.bulk_create([
+                Payment(
+                    order=o,
+                    user=request.user,
+                    amount=order_totals[o.pk],
+                    status='pending',
+                    payment_method=payment_method_type
+                )
+                for o in orders if o.pk not in payments
+            ])
+            payments = {p.order_id: p for p in Payment.objects.filter(order__in=orders)}
+            payment = payments[order.pk] if order.pk in payments else payments[orders[0].pk]
             
             # Reject cash on delivery requests
             if payment_method_type == 'cash_on_delivery':
@@ -123,6 +133,8 @@ class CreatePaymentIntentView(LoginRequiredMixin, View):
                     'callback_url': settings.PAYSTACK_CALLBACK_URL,
                     'metadata': {
                         'order_id': str(order.id),
+                        'order_ids': [str(o.id) for o in orders],
+                        'checkout_group': str(order.checkout_group) if order.checkout_group else None,
                         'payment_id': str(payment.id),
                         'customer_id': str(request.user.id),
                         'custom_fields': [
@@ -150,9 +162,10 @@ class CreatePaymentIntentView(LoginRequiredMixin, View):
                 response_data = response.json()
                 
                 if response_data.get('status'):
-                    # Update payment with Paystack reference
-                    payment.paystack_reference = reference
-                    payment.save()
+                    # Update payments with Paystack reference
+                    Payment.objects.filter(
+                        pk__in=[p.pk for p in payments.values()]
+                    ).update(paystack_reference=reference, updated_at=timezone.now())
                     
                     return JsonResponse({
                         'success': True,
@@ -180,18 +193,21 @@ class ProcessPaymentView(LoginRequiredMixin, TemplateView):
         order_id = kwargs.get('order_id')
         
         order = get_object_or_404(Order, id=order_id, customer=self.request.user)
+        orders = list(
+            order.get_checkout_orders().select_related('restaurant').prefetch_related('items__meal').order_by('pk')
+        )
         
-        # Calculate totals using database settings
-        from core.utils import get_delivery_fee, get_tax_rate
-        
-        subtotal = order.total_amount
-        delivery_fee = get_delivery_fee()
-        tax_rate = get_tax_rate() / Decimal('100')  # Convert percentage to decimal
-        tax_amount = (subtotal + delivery_fee) * tax_rate
-        total_amount = subtotal + delivery_fee + tax_amount
+        # Totals from the charges snapshotted at checkout
+        for o in orders:
+            o.ensure_charges()
+        subtotal = sum((o.total_amount for o in orders), Decimal('0.00'))
+        delivery_fee = sum((o.delivery_fee for o in orders), Decimal('0.00'))
+        tax_amount = sum((o.tax_amount for o in orders), Decimal('0.00'))
+        total_amount = sum((o.grand_total for o in orders), Decimal('0.00'))
         
         context.update({
             'order': order,
+            'orders': orders,
             'subtotal': subtotal,
             'delivery_fee': delivery_fee,
             'tax_amount': tax_amount,
@@ -259,36 +275,42 @@ class PaystackVerificationView(LoginRequiredMixin, View):
             
             response_data = response.json()
             
+            # A combined checkout shares one reference across its payments
+            payments = list(Payment.objects.filter(paystack_reference=reference).select_related('order'))
+            if not payments:
+                raise Payment.DoesNotExist
+            payment = payments[0]
+            
             if response_data.get('status') and response_data['data']['status'] == 'success':
-                # Find payment by reference
-                payment = Payment.objects.get(paystack_reference=reference)
-                
-                # Update payment status
-                payment.status = 'succeeded'
-                payment.paystack_transaction_id = response_data['data']['id']
-                payment.paid_at = timezone.now()
-                payment.save()
-                
-                # Update order status
-                order = payment.order
-                order.status = 'confirmed'
-                order.save()
-                
-                # Send confirmation emails
-                try:
-                    send_order_confirmation_email(order, payment)
-                    send_restaurant_notification_email(order, payment)
-                except Exception as e:
-                    logger.error(f"Failed to send emails for order {order.id}: {str(e)}")
+                with transaction.atomic():
+                    # Update payment status
+                    Payment.objects.filter(pk__in=[p.pk for p in payments]).update(
+                        status='succeeded',
+                        paystack_transaction_id=response_data['data']['id'],
+                        paid_at=timezone.now(),
+                        updated_at=timezone.now()
+                    )
+                    
+                    # Update order status
+                    for p in payments:
+                        p.order.status = 'confirmed'
+                        p.order.save()
+                    
+                    # Queue confirmation emails; process_outbox sends them after commit.
+                    # One message per email so a failed one is retried without resending the other
+                    payloads = [{'payment_id': str(p.pk)} for p in payments]
+                    outbox.enqueue_many('order_confirmation_email', payloads)
+                    outbox.enqueue_many('restaurant_notification_email', payloads)
                 
                 messages.success(request, 'Payment successful! Your order has been confirmed.')
                 return redirect('payments:payment_success', payment_id=payment.id)
             else:
                 # Payment failed
-                payment = Payment.objects.get(paystack_reference=reference)
-                payment.status = 'failed'
-                payment.failure_reason = response_data.get('message', 'Payment verification failed')
-                payment.save()
+                Payment.objects.filter(pk__in=[p.pk for p in payments]).update(
+                    status='failed',
+                    failure_reason=response_data.get('message', 'Payment verification failed'),
+                    updated_at=timezone.now()
+                )
                 
                 messages.error(request, 'Payment failed. Please try again.')
                 return redirect('payments:payment_failed', payment_id=payment.id)
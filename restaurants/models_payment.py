@@ -98,6 +98,12 @@ class RestaurantPayout(models.Model):
         related_name='payouts',
         blank=True
     )
+    # Orders of this payout that have since been archived
+    archived_orders = models.ManyToManyField(
+        'orders.ArchivedOrder',
+        related_name='payouts',
+        blank=True
+    )
     
     # Transaction details
     reference = models.CharField(max_length=100, unique=True)
@@ -136,11 +142,21 @@ class RestaurantEarning(models.Model):
         on_delete=models.CASCADE, 
         related_name='earnings'
     )
+    # Archived orders leave the live table; the earning then points at the archived copy
     order = models.OneToOneField(
         'orders.Order', 
-        on_delete=models.CASCADE, 
+        on_delete=models.SET_NULL, 
+        null=True,
+        blank=True,
         related_name='restaurant_earning'
     )
+    archived_order = models.OneToOneField(
+        'orders.ArchivedOrder',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='kept_earning'
+    )
     
     # Financial details
     order_amount = models.DecimalField(max_digits=10, decimal_places=2)
@@ -163,12 +179,16 @@ class RestaurantEarning(models.Model):
     paid_out_at = models.DateTimeField(null=True, blank=True)
     
     def __str__(self):
-        return f"Earning from Order #{self.order.id} - {self.restaurant.name}"
+        return f"Earning from Order #{self.order_id or self.archived_order_id} - {self.restaurant.name}"
     
     class Meta:
         verbose_name = "Restaurant Earning"
         verbose_name_plural = "Restaurant Earnings"
         ordering = ['-created_at']
+        indexes = [
+            # Unpaid earnings per restaurant for payouts
+            models.Index(fields=['restaurant', 'is_paid_out'], name='earning_rest_paid_out_idx'),
+        ]
     
     def save(self, *args, **kwargs):
         # Calculate commission and earnings
@@ -13,6 +13,7 @@ import logging
 from .models import Restaurant
 from .models_pos import POSSession, POSOrder, POSOrderItem, POSReceipt
 from meals.models import Meal, Category
+from superadmin.models import DailyRestaurantMetrics
 
 logger = logging.getLogger(__name__)
 
@@ -336,12 +337,16 @@ class POSReportsView(LoginRequiredMixin, TemplateView):
             status='completed'
         )
         
-        # Calculate metrics
-        total_sales = orders.aggregate(
-            total=Sum('total_amount')
-        )['total'] or Decimal('0.00')
-        
-        order_count = orders.count()
+        # Totals from the daily rollup; the breakdowns below need the orders themselves
+        totals = DailyRestaurantMetrics.objects.filter(
+            restaurant=restaurant,
+            date__range=[start_date, end_date]
+        ).aggregate(
+            total=Sum('pos_sales', default=Decimal('0.00')),
+            count=Sum('pos_orders', default=0)
+        )
+        total_sales = totals['total']
+        order_count = totals['count']
         avg_order_value = total_sales / order_count if order_count > 0 else Decimal('0.00')
         
         # Payment method breakdown
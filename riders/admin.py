@@ -1,10 +1,12 @@
+from django import forms
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 from django.conf import settings
-from .models import RiderProfile, DeliveryAssignment, RiderEarning
+from .models import RiderProfile, DeliveryAssignment, RiderEarning, RiderLocation, RiderDailyEarning
+from .transitions import TRANSITIONS, transition
 
 @admin.register(RiderProfile)
 class RiderProfileAdmin(admin.ModelAdmin):
@@ -81,8 +83,24 @@ class RiderProfileAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('user')
 
 
+class DeliveryAssignmentAdminForm(forms.ModelForm):
+    """Only offers status changes that transition() allows"""
+    
+    class Meta:
+        model = DeliveryAssignment
+        fields = '__all__'
+    
+    def clean_status(self):
+        status = self.cleaned_data['status']
+        old_status = self.instance.status if self.instance.pk else None
+        if old_status and status != old_status and status not in TRANSITIONS.get(old_status, ()):
+            raise forms.ValidationError(f'Cannot change a {old_status} delivery to {status}')
+        return status
+
+
 @admin.register(DeliveryAssignment)
 class DeliveryAssignmentAdmin(admin.ModelAdmin):
+    form = DeliveryAssignmentAdminForm
     list_display = [
         'order', 'rider', 'status', 'delivery_fee',
         'assigned_at', 'picked_up_at', 'delivered_at'
@@ -140,6 +158,16 @@ class DeliveryAssignmentAdmin(admin.ModelAdmin):
         return "-"
     rider.short_description = 'Rider'
     
+    def save_model(self, request, obj, form, change):
+        """Status changes go through transition(), so they update the order and send status_changed once"""
+        if change and 'status' in form.changed_data:
+            new_status = obj.status
+            obj.status = form.initial['status']
+            # Keep a timestamp the admin entered for the new status
+            at = {'picked_up': obj.picked_up_at, 'delivered': obj.delivered_at}.get(new_status)
+            transition(obj, new_status, reason=f'by {request.user.username} in admin', at=at)
+        super().save_model(request, obj, form, change)
+    
     def get_queryset(self, request):
         return super().get_queryset(request).select_related(
             'order', 'rider', 'rider__user'
@@ -191,6 +219,32 @@ class RiderWarningAdmin(admin.ModelAdmin):
         )
 
 
+
+@admin.register(RiderDailyEarning)
+class RiderDailyEarningAdmin(admin.ModelAdmin):
+    list_display = ['rider', 'date', 'deliveries', 'earnings', 'updated_at']
+    list_filter = ['date']
+    search_fields = ['rider__user__username']
+    raw_id_fields = ['rider']
+    date_hierarchy = 'date'
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('rider__user')
+
+@admin.register(RiderLocation)
+class RiderLocationAdmin(admin.ModelAdmin):
+    list_display = [
+        'rider', 'assignment', 'latitude', 'longitude',
+        'accuracy', 'recorded_at', 'received_at'
+    ]
+    list_filter = ['recorded_at']
+    search_fields = ['rider__user__username']
+    raw_id_fields = ['rider', 'assignment']
+    date_hierarchy = 'recorded_at'
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('rider__user')
+
 # Extend UserAdmin to show rider profile link
 class CustomUserAdmin(UserAdmin):
     list_display = UserAdmin.list_display + ('rider_profile_link',)
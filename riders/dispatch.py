@@ -0,0 +1,262 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+import heapq
+import math
+import threading
+import time
+
+from orders.models import Order
+from .models import RiderProfile, DeliveryAssignment
+from . import presence
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Grid cell size in degrees (0.01 is about 1.1 km north-south)
+CELL_SIZE = getattr(settings, 'RIDER_GRID_CELL_SIZE', 0.01)
+# How often each process reloads rider positions from the database
+REFRESH_SECONDS = getattr(settings, 'RIDER_GRID_REFRESH_SECONDS', 30)
+# Riders suggested for, or notified about, each ready order
+DEFAULT_K = getattr(settings, 'RIDER_DISPATCH_K', 5)
+# Riders further than this from the restaurant are not offered the order
+MAX_DISTANCE_KM = getattr(settings, 'RIDER_DISPATCH_MAX_KM', 15)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in kilometres"""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2 +
+        math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class RiderGrid:
+    """
+    In-memory spatial index of rider positions.
+
+    Riders are bucketed into fixed-size lat/lng cells. A nearest query
+    searches rings of cells outward from the query point and stops as soon
+    as no unvisited cell can hold anything closer than the k-th best hit,
+    so it only touches the few cells around the restaurant.
+    """
+
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _cell(self, latitude, longitude):
+        return math.floor(latitude / self.cell_size), math.floor(longitude / self.cell_size)
+
+    def update(self, rider_id, latitude, longitude):
+        """Add a rider or move them to a new position"""
+        self.remove(rider_id)
+        cell = self._cell(latitude, longitude)
+        self.cells.setdefault(cell, {})[rider_id] = (latitude, longitude)
+        self.positions[rider_id] = cell
+
+    def remove(self, rider_id):
+        cell = self.positions.pop(rider_id, None)
+        if cell is not None:
+            riders = self.cells[cell]
+            riders.pop(rider_id, None)
+            if not riders:
+                del self.cells[cell]
+
+    def _ring(self, row, col, radius):
+        """Cells exactly `radius` steps (Chebyshev) away from (row, col)"""
+        if radius == 0:
+            yield row, col
+            return
+        for d in range(-radius, radius + 1):
+            yield row - radius, col + d
+            yield row + radius, col + d
+        for d in range(-radius + 1, radius):
+            yield row + d, col - radius
+            yield row + d, col + radius
+
+    def nearest(self, latitude, longitude, k=DEFAULT_K, max_km=None, exclude=()):
+        """
+        The k riders closest to a point.
+
+        Args:
+            latitude, longitude: float - Query point
+            k: int - Maximum number of riders to return
+            max_km: float - Ignore riders further away than this
+            exclude: Rider ids to skip (e.g. riders already on a delivery)
+
+        Returns:
+            list: (rider id, distance in km) tuples, nearest first
+        """
+        if not self.positions or k <= 0:
+            return []
+
+        row, col = self._cell(latitude, longitude)
+        # Smallest cell side in km at this latitude bounds how far each ring reaches
+        cell_km = self.cell_size * KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01)
+        exclude = set(exclude)
+        hits = []
+        visited = 0
+        radius = 0
+
+        while visited < len(self.cells):
+            ring = list(self._ring(row, col, radius))
+            if len(ring) > len(self.cells):
+                # Sparse grid: checking every occupied cell is now cheaper than ringing outwards
+                cells = [cell for cell in self.cells if max(abs(cell[0] - row), abs(cell[1] - col)) >= radius]
+            else:
+                cells = [cell for cell in ring if cell in self.cells]
+
+            for cell in cells:
+                visited += 1
+                for rider_id, (lat, lng) in self.cells[cell].items():
+                    if rider_id in exclude:
+                        continue
+                    distance = haversine_km(latitude, longitude, lat, lng)
+                    if max_km is None or distance <= max_km:
+                        hits.append((distance, rider_id))
+
+            if len(ring) > len(self.cells):
+                break
+
+            # Anything in rings beyond this one is at least radius * cell_km away
+            reach = radius * cell_km
+            if max_km is not None and reach > max_km:
+                break
+            if len(hits) >= k and heapq.nsmallest(k, hits)[-1][0] <= reach:
+                break
+            radius += 1
+
+        return [(rider_id, distance) for distance, rider_id in heapq.nsmallest(k, hits)]
+
+
+_grid = None
+_grid_loaded_at = 0.0
+_grid_lock = threading.Lock()
+
+
+def eligible_riders():
+    """Riders who can be offered an order: approved, active and online"""
+    return RiderProfile.objects.filter(
+        user__is_approved=True,
+        is_active=True,
+        is_online=True
+    )
+
+
+def get_grid():
+    """This process's rider grid, reloaded from the database every REFRESH_SECONDS"""
+    global _grid, _grid_loaded_at
+
+    with _grid_lock:
+        if _grid is None or time.monotonic() - _grid_loaded_at > REFRESH_SECONDS:
+            grid = RiderGrid()
+            located = eligible_riders().filter(
+                last_latitude__isnull=False,
+                last_longitude__isnull=False
+            ).values_list('id', 'last_latitude', 'last_longitude')
+            for rider_id, latitude, longitude in located:
+                grid.update(rider_id, float(latitude), float(longitude))
+            _grid = grid
+            _grid_loaded_at = time.monotonic()
+        return _grid
+
+
+def sync_rider(rider):
+    """Apply a saved rider's status and position to the grid, if it is loaded"""
+    if _grid is None:
+        return
+
+    with _grid_lock:
+        located = rider.last_latitude is not None and rider.last_longitude is not None
+        if located and rider.is_online and rider.is_active and rider.is_approved:
+            _grid.update(rider.id, float(rider.last_latitude), float(rider.last_longitude))
+        else:
+            _grid.remove(rider.id)
+
+
+def suggest_riders(orders, k=DEFAULT_K, max_km=MAX_DISTANCE_KM):
+    """
+    The k nearest eligible riders to each order's restaurant.
+
+    Orders whose restaurant has no coordinates, or with no located rider in
+    range, fall back to the most recently active eligible riders so they
+    can still be dispatched. Riders are loaded with one query for all
+    orders, and riders whose app has stopped sending heartbeats are left
+    out.
+
+    Returns:
+        dict: order pk -> list of (RiderProfile, distance in km or None)
+    """
+    grid = get_grid()
+    hits = {}
+    for order in orders:
+        restaurant = order.restaurant
+        if restaurant.latitude is None or restaurant.longitude is None:
+            hits[order.pk] = []
+        else:
+            hits[order.pk] = grid.nearest(float(restaurant.latitude), float(restaurant.longitude), k, max_km)
+
+    rider_ids = {rider_id for order_hits in hits.values() for rider_id, _ in order_hits}
+    # Re-check eligibility: another process may have taken a rider offline since the grid loaded
+    riders = eligible_riders().select_related('user').in_bulk(rider_ids) if rider_ids else {}
+    live = presence.alive(riders)
+    riders = {rider_id: rider for rider_id, rider in riders.items() if rider_id in live}
+
+    fallback = None
+    suggestions = {}
+    for order in orders:
+        nearby = [(riders[rider_id], distance) for rider_id, distance in hits[order.pk] if rider_id in riders]
+        if not nearby:
+            if fallback is None:
+                recent = list(eligible_riders().select_related('user').order_by(
+                    F('last_active_at').desc(nulls_last=True)
+                )[:k * 4])
+                live = presence.alive(rider.id for rider in recent)
+                fallback = [(rider, None) for rider in recent if rider.id in live][:k]
+            nearby = fallback
+        suggestions[order.pk] = nearby
+
+    return suggestions
+
+
+def riders_for_order(order, k=DEFAULT_K):
+    """The k nearest eligible riders for one order (see suggest_riders)"""
+    return suggest_riders([order], k)[order.pk]
+
+
+def claim_order(order, rider, status='delivering', **assignment_fields):
+    """
+    Take a ready order off the pool and assign it to a rider.
+
+    The claim is a single conditional UPDATE of the order's status, so of
+    any number of concurrent claims exactly one sees a row updated; the
+    others fail fast without reading or writing anything else. The
+    assignment is created in the same transaction as the winning UPDATE.
+
+    Args:
+        order: Order - The order to claim; its status is updated in place
+        rider: RiderProfile - Rider taking the order
+        status: str - Order status once claimed
+        **assignment_fields: Extra DeliveryAssignment fields (delivery_fee, notes...)
+
+    Returns:
+        DeliveryAssignment, or None if the order was no longer ready
+    """
+    with transaction.atomic():
+        claimed = Order.objects.filter(pk=order.pk, status='ready').update(
+            status=status,
+            updated_at=timezone.now()
+        )
+        if not claimed:
+            return None
+
+        order.status = status
+        return DeliveryAssignment.objects.create(order=order, rider=rider, **assignment_fields)
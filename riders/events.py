@@ -0,0 +1,41 @@
+from core.pubsub import publish_on_commit
+
+# Every connected rider hears about the open order pool
+RIDERS_CHANNEL = 'riders'
+
+
+def rider_channel(rider_id):
+    """Channel for events about one rider's own assignments"""
+    return f'rider_{rider_id}'
+
+
+def order_ready(order):
+    """An order is waiting for a rider"""
+    restaurant = order.restaurant
+    publish_on_commit(RIDERS_CHANNEL, 'order_ready', {
+        'order_id': str(order.id),
+        'order_number': order.order_number,
+        'restaurant': {
+            'id': restaurant.id,
+            'name': restaurant.name,
+            'latitude': float(restaurant.latitude) if restaurant.latitude is not None else None,
+            'longitude': float(restaurant.longitude) if restaurant.longitude is not None else None,
+        },
+    })
+
+
+def order_claimed(assignment):
+    """An order left the pool; other riders should drop it from their list"""
+    publish_on_commit(RIDERS_CHANNEL, 'order_claimed', {
+        'order_id': str(assignment.order_id),
+        'rider_id': str(assignment.rider_id),
+    })
+
+
+def assignment_updated(assignment):
+    """An assignment changed status; sent only to the assigned rider"""
+    publish_on_commit(rider_channel(assignment.rider_id), 'assignment_updated', {
+        'assignment_id': str(assignment.id),
+        'order_id': str(assignment.order_id),
+        'status': assignment.status,
+    })
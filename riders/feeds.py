@@ -0,0 +1,22 @@
+from core.versions import bump_versions
+
+# Change-version names for the feeds the rider app polls
+AVAILABLE_ORDERS = 'available_orders'
+
+
+def active_orders_feed(rider_id):
+    return f'active_orders_{rider_id}'
+
+
+def orders_changed(*rider_ids):
+    """Invalidate the available-orders feed and the given riders' active-orders feeds"""
+    bump_versions(AVAILABLE_ORDERS, *(active_orders_feed(rider_id) for rider_id in rider_ids))
+
+
+def earnings_feed(rider_id):
+    return f'earnings_{rider_id}'
+
+
+def earnings_changed(*rider_ids):
+    """Invalidate the given riders' earnings summaries"""
+    bump_versions(*(earnings_feed(rider_id) for rider_id in rider_ids))
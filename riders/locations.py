@@ -0,0 +1,345 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+import atexit
+import logging
+import threading
+import time
+
+from .dispatch import sync_rider
+from . import presence
+from .models import RiderProfile, DeliveryAssignment, RiderLocation
+
+logger = logging.getLogger(__name__)
+
+# Largest batch the app may send in one request
+MAX_BATCH_POINTS = getattr(settings, 'RIDER_LOCATION_MAX_BATCH', 500)
+# Buffered points are written once the oldest is this old, or the buffer this large
+FLUSH_SECONDS = getattr(settings, 'RIDER_LOCATION_FLUSH_SECONDS', 5)
+FLUSH_SIZE = getattr(settings, 'RIDER_LOCATION_FLUSH_SIZE', 1000)
+# How long a rider's latest position stays in the cache after their last ping
+LATEST_TTL = getattr(settings, 'RIDER_LOCATION_TTL', 15 * 60)
+# Points kept in memory while the database is unavailable before new ones are dropped
+MAX_BUFFERED = FLUSH_SIZE * 20
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+ACTIVE_STATUSES = ('assigned', 'picked_up', 'delivering')
+COORDINATE = Decimal('0.000001')
+
+
+class InvalidPoint(ValueError):
+    """A GPS point that cannot be stored"""
+
+
+class BufferFull(Exception):
+    """The location buffer is full, e.g. while the database is down; the batch was not taken"""
+
+
+def parse_timestamp(value):
+    """ISO 8601 string, or Unix time in seconds or milliseconds, as an aware datetime"""
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            try:
+                parsed = parse_datetime(value)
+            except ValueError:
+                parsed = None
+            if parsed is None:
+                raise InvalidPoint(f'Invalid timestamp: {value}')
+            if timezone.is_naive(parsed):
+                parsed = timezone.make_aware(parsed, dt_timezone.utc)
+            return parsed
+
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise InvalidPoint(f'Invalid timestamp: {value}')
+    if value > 1e11:
+        # Android reports milliseconds
+        value = value / 1000
+    try:
+        return datetime.fromtimestamp(value, tz=dt_timezone.utc)
+    except (OverflowError, OSError, ValueError):
+        raise InvalidPoint(f'Invalid timestamp: {value}')
+
+
+def parse_coordinate(point, name, limit):
+    """point[name] as a Decimal rounded to the model's 6 places, within +/- limit degrees"""
+    try:
+        value = Decimal(str(point[name])).quantize(COORDINATE)
+    except KeyError:
+        raise InvalidPoint(f'{name} is required')
+    except (InvalidOperation, ValueError):
+        raise InvalidPoint(f'Invalid {name}')
+    if not value.is_finite():
+        raise InvalidPoint(f'Invalid {name}')
+    if not -limit <= value <= limit:
+        raise InvalidPoint(f'{name} out of range')
+    return value
+
+
+def _optional_float(point, name):
+    value = point.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise InvalidPoint(f'Invalid {name}')
+
+
+def parse_point(point, now):
+    """
+    Validate one point from the app.
+
+    Args:
+        point: dict - latitude, longitude and recorded_at, plus optional
+            accuracy (m), speed (m/s) and heading (degrees)
+        now: datetime - Time the batch was received
+
+    Returns:
+        dict: Cleaned RiderLocation field values
+    """
+    if not isinstance(point, dict):
+        raise InvalidPoint('Point must be an object')
+    if point.get('recorded_at') in (None, ''):
+        raise InvalidPoint('recorded_at is required')
+
+    recorded_at = parse_timestamp(point['recorded_at'])
+    if recorded_at > now + MAX_CLOCK_SKEW:
+        raise InvalidPoint('recorded_at is in the future')
+
+    return {
+        'latitude': parse_coordinate(point, 'latitude', 90),
+        'longitude': parse_coordinate(point, 'longitude', 180),
+        'accuracy': _optional_float(point, 'accuracy'),
+        'speed': _optional_float(point, 'speed'),
+        'heading': _optional_float(point, 'heading'),
+        'recorded_at': recorded_at,
+    }
+
+
+def latest_location_key(rider_id):
+    return f'rider_location_{rider_id}'
+
+
+def get_latest_location(rider):
+    """
+    The rider's most recent position.
+
+    Read from the cache, which every ingest updates immediately; falls back to
+    the position last written to the rider's profile.
+
+    Returns:
+        dict: latitude, longitude, recorded_at (ISO 8601), or None if unknown
+    """
+    latest = cache.get(latest_location_key(rider.id))
+    if latest is None and rider.last_latitude is not None and rider.last_longitude is not None:
+        latest = {
+            'latitude': float(rider.last_latitude),
+            'longitude': float(rider.last_longitude),
+            'recorded_at': rider.location_updated_at.isoformat() if rider.location_updated_at else None,
+        }
+    return latest
+
+
+class LocationBuffer:
+    """
+    Per-process write-behind buffer for GPS points.
+
+    Requests only append to memory; points are written with one bulk INSERT,
+    and each rider's newest position with one bulk UPDATE of the rider
+    profiles, when the buffer is FLUSH_SECONDS old or FLUSH_SIZE points big.
+    A background thread flushes a quiet buffer, and whatever is left is
+    flushed when the process exits.
+    """
+
+    def __init__(self, flush_seconds=FLUSH_SECONDS, flush_size=FLUSH_SIZE):
+        self.flush_seconds = flush_seconds
+        self.flush_size = flush_size
+        self.points = []
+        self.positions = {}
+        self.oldest = None
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.flusher = None
+
+    def __len__(self):
+        return len(self.points)
+
+    def add(self, locations):
+        """Queue unsaved RiderLocation objects, flushing if the buffer is due; raises BufferFull if it is full"""
+        with self.lock:
+            if len(self.points) >= MAX_BUFFERED:
+                logger.error(f"Rider location buffer full, dropping {len(locations)} points")
+                raise BufferFull(f'{len(locations)} points dropped')
+            self.points.extend(locations)
+            for location in locations:
+                current = self.positions.get(location.rider_id)
+                if current is None or location.recorded_at > current.recorded_at:
+                    self.positions[location.rider_id] = location
+            if self.oldest is None:
+                self.oldest = time.monotonic()
+            due = (
+                len(self.points) >= self.flush_size or
+                time.monotonic() - self.oldest >= self.flush_seconds
+            )
+            if self.flusher is None:
+                self.flusher = threading.Thread(target=self._run, name='rider-location-flusher', daemon=True)
+                self.flusher.start()
+
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write everything buffered so far; returns the number of points written"""
+        with self.flush_lock:
+            with self.lock:
+                points, positions = self.points, self.positions
+                self.points, self.positions, self.oldest = [], {}, None
+            if not points:
+                return 0
+
+            try:
+                RiderLocation.objects.bulk_create(points, batch_size=500)
+                positions = list(positions.items())
+                for start in range(0, len(positions), 500):
+                    update_positions(positions[start:start + 500])
+            except Exception as e:
+                logger.error(f"Error writing {len(points)} rider locations: {e}")
+                self._requeue(points)
+                return 0
+
+            return len(points)
+
+    def _requeue(self, points):
+        """Put points back after a failed write so the next flush retries them"""
+        for location in points:
+            location.pk = None
+        with self.lock:
+            self.points[:0] = points[:MAX_BUFFERED - len(self.points)]
+            for location in points:
+                current = self.positions.get(location.rider_id)
+                if current is None or location.recorded_at > current.recorded_at:
+                    self.positions[location.rider_id] = location
+            if self.points and self.oldest is None:
+                self.oldest = time.monotonic()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                with self.lock:
+                    due = self.oldest is not None and time.monotonic() - self.oldest >= self.flush_seconds
+                if due:
+                    self.flush()
+            except Exception as e:
+                logger.error(f"Error in rider location flusher: {e}")
+            finally:
+                close_old_connections()
+
+
+def update_positions(positions):
+    """
+    Write each rider's newest position to their profile in one UPDATE.
+
+    A profile is only changed where the point is newer than the position it
+    already holds, so a flush from another process, or a late retry, never
+    moves a rider back to an older point.
+
+    Args:
+        positions: list of (rider_id, RiderLocation)
+    """
+    values = {'last_latitude': [], 'last_longitude': [], 'location_updated_at': []}
+    for rider_id, location in positions:
+        newer = Q(pk=rider_id) & (
+            Q(location_updated_at__isnull=True) | Q(location_updated_at__lt=location.recorded_at)
+        )
+        values['last_latitude'].append(When(newer, then=Value(location.latitude)))
+        values['last_longitude'].append(When(newer, then=Value(location.longitude)))
+        values['location_updated_at'].append(When(newer, then=Value(location.recorded_at)))
+
+    # location_updated_at goes last: MySQL applies SET clauses in order, and
+    # the coordinates must be compared with the position held before this update
+    RiderProfile.objects.filter(pk__in=[rider_id for rider_id, _ in positions]).update(**{
+        field: Case(*whens, default=F(field), output_field=RiderProfile._meta.get_field(field))
+        for field, whens in values.items()
+    })
+
+
+buffer = LocationBuffer()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        buffer.flush()
+    except Exception as e:
+        logger.error(f"Error flushing rider locations on exit: {e}")
+
+
+def ingest(rider, points):
+    """
+    Accept a batch of GPS points from a rider.
+
+    Valid points are buffered for the next bulk write and the newest one
+    becomes the rider's latest position in the cache and this process's
+    dispatch grid straight away. A bad point is rejected on its own without
+    failing the rest of the batch. If the buffer is full the whole batch
+    is refused with BufferFull, so the app can send it again later.
+
+    Args:
+        rider: RiderProfile
+        points: list of point dicts (see parse_point)
+
+    Returns:
+        tuple: (number of points accepted, list of {'index', 'error'} for rejected points)
+    """
+    now = timezone.now()
+    cleaned = []
+    rejected = []
+    for index, point in enumerate(points):
+        try:
+            cleaned.append(parse_point(point, now))
+        except InvalidPoint as e:
+            rejected.append({'index': index, 'error': str(e)})
+
+    if not cleaned:
+        return 0, rejected
+
+    assignment_id = DeliveryAssignment.objects.filter(
+        rider=rider,
+        status__in=ACTIVE_STATUSES
+    ).order_by('-assigned_at').values_list('id', flat=True).first()
+
+    locations = [
+        RiderLocation(rider_id=rider.id, assignment_id=assignment_id, received_at=now, **values)
+        for values in cleaned
+    ]
+
+    buffer.add(locations)
+
+    newest = max(locations, key=lambda location: location.recorded_at)
+    key = latest_location_key(rider.id)
+    latest = cache.get(key)
+    if latest is None or parse_datetime(latest['recorded_at']) < newest.recorded_at:
+        cache.set(key, {
+            'latitude': float(newest.latitude),
+            'longitude': float(newest.longitude),
+            'accuracy': newest.accuracy,
+            'recorded_at': newest.recorded_at.isoformat(),
+        }, LATEST_TTL)
+
+        rider.last_latitude = newest.latitude
+        rider.last_longitude = newest.longitude
+        rider.location_updated_at = newest.recorded_at
+        sync_rider(rider)
+
+    # A location batch doubles as a heartbeat
+    if rider.is_online:
+        presence.heartbeat(rider.id)
+
+    return len(locations), rejected
@@ -0,0 +1,165 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from contextlib import contextmanager
+from decimal import Decimal
+import threading
+import time
+
+from orders.models import Order, make_order_number
+from restaurants.models import Restaurant
+from riders.dispatch import claim_order, eligible_riders
+from riders.models import DeliveryAssignment
+
+
+def legacy_claim(order, rider):
+    """Check-then-create claim as accept_order worked before claim_order, kept for comparison"""
+    order = Order.objects.get(pk=order.pk)
+    if order.status != 'ready':
+        return None
+    if DeliveryAssignment.objects.filter(order=order, status__in=['assigned', 'picked_up', 'delivering']).exists():
+        return None
+    assignment = DeliveryAssignment.objects.create(order=order, rider=rider, delivery_fee=Decimal('0.00'))
+    order.status = 'delivering'
+    order.save()
+    return assignment
+
+
+@contextmanager
+def muted_signals(*signals):
+    """
+    Disconnect every receiver of the given signals for the duration, so the
+    fake orders send no emails, SSE events or metric updates. The receivers
+    are process-wide, which is fine for a one-off command.
+    """
+    saved = [(signal, signal.receivers) for signal in signals]
+    for signal in signals:
+        signal.receivers = []
+        signal.sender_receivers_cache.clear()
+    try:
+        yield
+    finally:
+        for signal, receivers in saved:
+            signal.receivers = receivers
+            signal.sender_receivers_cache.clear()
+
+
+class Command(BaseCommand):
+    help = (
+        'Race rider threads claiming the same ready orders and report winners per order '
+        'and claims per second (benchmark orders are deleted afterwards, and model signals '
+        'are muted while it runs)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--orders',
+            type=int,
+            default=20,
+            help='Number of ready orders to race for'
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=10,
+            help='Concurrent claims per order'
+        )
+        parser.add_argument(
+            '--legacy',
+            action='store_true',
+            help='Also race the old check-then-create claim for comparison'
+        )
+
+    def handle(self, *args, **options):
+        if options['orders'] < 1 or options['threads'] < 2:
+            raise CommandError('Need at least one order and two threads')
+
+        riders = list(eligible_riders().order_by('pk')[:options['threads']])
+        if not riders:
+            raise CommandError('No approved, active, online riders to claim with')
+        restaurant = Restaurant.objects.order_by('pk').first()
+        if restaurant is None:
+            raise CommandError('No restaurant to create benchmark orders for')
+
+        pipelines = [('atomic', lambda order, rider: claim_order(order, rider, delivery_fee=Decimal('0.00')))]
+        if options['legacy']:
+            pipelines.append(('legacy', legacy_claim))
+
+        self.stdout.write(
+            f"{'claim':>7} {'orders':>7} {'attempts':>9} {'1 winner':>9} {'>1 winner':>10} "
+            f"{'errors':>7} {'claims/s':>9}"
+        )
+        with muted_signals(pre_save, post_save, pre_delete, post_delete):
+            for name, claim in pipelines:
+                orders = self._create_orders(restaurant, options['orders'])
+                try:
+                    winners, errors, elapsed = self._race(claim, orders, riders, options['threads'])
+                    assigned = DeliveryAssignment.objects.filter(order__in=orders).values_list('order_id', flat=True)
+                    per_order = {order.pk: 0 for order in orders}
+                    for order_id in assigned:
+                        per_order[order_id] += 1
+                finally:
+                    # Assignments outlive a deleted order, so remove them first
+                    DeliveryAssignment.objects.filter(order__in=orders).delete()
+                    Order.objects.filter(pk__in=[order.pk for order in orders]).delete()
+
+                attempts = len(orders) * options['threads']
+                single = sum(1 for count in per_order.values() if count == 1)
+                double = sum(1 for count in per_order.values() if count > 1)
+                self.stdout.write(
+                    f"{name:>7} {len(orders):>7} {attempts:>9} {single:>9} {double:>10} "
+                    f"{errors:>7} {attempts / elapsed:>9.0f}"
+                )
+                if name == 'atomic' and (double or winners != len(orders)):
+                    raise CommandError(f'Atomic claim let {winners} claims win for {len(orders)} orders')
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete, benchmark orders were deleted.'))
+
+    def _create_orders(self, restaurant, count):
+        orders = []
+        for _ in range(count):
+            order = Order(
+                customer=restaurant.owner,
+                restaurant=restaurant,
+                status='ready',
+                total_amount=Decimal('100.00'),
+                delivery_address='Benchmark address',
+                phone='0700000000'
+            )
+            order.order_number = make_order_number(order.id)
+            orders.append(order)
+        return Order.objects.bulk_create(orders)
+
+    def _race(self, claim, orders, riders, threads):
+        """Start `threads` claims per order at the same instant; returns (winners, errors, seconds)"""
+        winners = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker(index):
+            rider = riders[index % len(riders)]
+            try:
+                barrier.wait()
+                for order in orders:
+                    try:
+                        # Each thread works on its own copy, as separate requests would
+                        won = claim(Order(pk=order.pk, status='ready'), rider)
+                    except Exception:
+                        with lock:
+                            errors.append(order.pk)
+                    else:
+                        if won is not None:
+                            with lock:
+                                winners.append(order.pk)
+            finally:
+                connection.close()
+
+        barrier = threading.Barrier(threads + 1)
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        for thread in workers:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for thread in workers:
+            thread.join()
+        return len(winners), len(errors), time.perf_counter() - started
@@ -0,0 +1,116 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from collections import defaultdict
+from decimal import Decimal
+import uuid
+
+from orders.models import ArchivedOrder
+from riders.feeds import earnings_changed
+from riders.models import DeliveryAssignment, RiderDailyEarning
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the RiderDailyEarning rollup from delivered assignments, including those of '
+        'archived orders'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            type=str,
+            help='Only rebuild days from this date (YYYY-MM-DD) onwards'
+        )
+        parser.add_argument(
+            '--rider',
+            type=str,
+            help='Only rebuild this rider profile (id)'
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        rider_id = None
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError('--since must be a date in YYYY-MM-DD format')
+        if options['rider']:
+            try:
+                rider_id = uuid.UUID(options['rider'])
+            except ValueError:
+                raise CommandError('--rider must be a rider profile id')
+
+        # Live assignments, and those of orders archived since archiving kept them (order is null)
+        delivered = DeliveryAssignment.objects.filter(status='delivered', delivered_at__isnull=False)
+        existing = RiderDailyEarning.objects.all()
+        if since:
+            delivered = delivered.filter(delivered_at__date__gte=since)
+            existing = existing.filter(date__gte=since)
+        if rider_id:
+            delivered = delivered.filter(rider_id=rider_id)
+            existing = existing.filter(rider_id=rider_id)
+
+        days = defaultdict(lambda: [0, Decimal('0.00')])
+        # One grouped query: a row per rider per local day
+        for day in delivered.annotate(day=TruncDate('delivered_at')).values('rider_id', 'day').annotate(
+            delivery_count=Count('id'),
+            fee_total=Sum('delivery_fee')
+        ).order_by():
+            totals = days[day['rider_id'], day['day']]
+            totals[0] += day['delivery_count']
+            totals[1] += day['fee_total']
+
+        for assignment in self._archived_assignments(since):
+            if rider_id and assignment['rider_id'] != rider_id:
+                continue
+            totals = days[assignment['rider_id'], assignment['day']]
+            totals[0] += 1
+            totals[1] += assignment['delivery_fee']
+
+        rows = [
+            RiderDailyEarning(rider_id=rider, date=date, deliveries=count, earnings=earnings)
+            for (rider, date), (count, earnings) in days.items()
+        ]
+
+        with transaction.atomic():
+            # Riders whose days are replaced or added need their earnings ETags refreshed
+            rider_ids = set(existing.values_list('rider_id', flat=True).distinct())
+            rider_ids.update(row.rider_id for row in rows)
+            deleted, _ = existing.delete()
+            RiderDailyEarning.objects.bulk_create(rows, batch_size=1000)
+            earnings_changed(*rider_ids)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {len(rows)} rider days (replaced {deleted}).'
+        ))
+
+    def _archived_assignments(self, since):
+        """
+        Delivered assignments of orders archived before archiving kept the
+        assignment rows, read from the archived order's JSON snapshots.
+
+        Yields:
+            dict: rider_id, day and delivery_fee of each delivered assignment
+        """
+        archived = ArchivedOrder.objects.filter(kept_assignments__isnull=True).exclude(delivery_assignments=[])
+        if since:
+            # Delivered on or after since means archived on or after it too
+            archived = archived.filter(archived_at__date__gte=since)
+
+        for snapshots in archived.values_list('delivery_assignments', flat=True).iterator():
+            for snapshot in snapshots:
+                delivered_at = parse_datetime(snapshot.get('delivered_at') or '')
+                if snapshot.get('status') != 'delivered' or delivered_at is None:
+                    continue
+                day = timezone.localdate(delivered_at)
+                if since and day < since:
+                    continue
+                yield {
+                    'rider_id': uuid.UUID(snapshot['rider_id']),
+                    'day': day,
+                    'delivery_fee': Decimal(snapshot.get('delivery_fee') or '0.00'),
+                }
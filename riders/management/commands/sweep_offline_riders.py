@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Case, When
+import time
+
+from riders import presence
+from riders.models import RiderProfile
+
+
+class Command(BaseCommand):
+    help = 'Take riders offline whose app stopped sending heartbeats, and record when live riders were last seen'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Riders checked per cache round trip and per UPDATE'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report stale riders without changing anything'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep sweeping instead of exiting after one pass'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=30.0,
+            help='Seconds between sweeps when --loop is set'
+        )
+
+    def handle(self, *args, **options):
+        if not presence.is_shared_cache():
+            # A private cache would hold no heartbeats and every rider would be swept
+            raise CommandError('Rider presence needs a shared cache; set REDIS_URL')
+
+        while True:
+            stale, live = self.sweep(options['batch_size'], options['dry_run'])
+            verb = 'Would take' if options['dry_run'] else 'Took'
+            self.stdout.write(f'{verb} {stale} stale riders offline; {live} riders online.')
+
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
+
+    def sweep(self, batch_size, dry_run):
+        """One pass over online riders; returns (stale count, live count)"""
+        online = list(RiderProfile.objects.filter(is_online=True).values_list('id', flat=True))
+        stale_total = live_total = 0
+
+        for start in range(0, len(online), batch_size):
+            batch = online[start:start + batch_size]
+            seen = presence.last_seen(batch)
+            stale = [rider_id for rider_id in batch if rider_id not in seen]
+            stale_total += len(stale)
+            live_total += len(seen)
+            if dry_run:
+                continue
+
+            if stale:
+                # One UPDATE per batch; is_online=True guards against a rider who just came back
+                RiderProfile.objects.filter(pk__in=stale, is_online=True).update(is_online=False)
+            if seen:
+                # Persist heartbeats as last_active_at in one UPDATE instead of a write per request
+                RiderProfile.objects.filter(pk__in=list(seen)).update(
+                    last_active_at=Case(*[When(pk=rider_id, then=at) for rider_id, at in seen.items()])
+                )
+
+        return stale_total, live_total
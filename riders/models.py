@@ -120,6 +120,11 @@ class RiderProfile(models.Model):
         help_text='Whether rider account is active'
     )
     
+    # Last known position, used to find the nearest riders for an order
+    last_latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    last_longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    location_updated_at = models.DateTimeField(null=True, blank=True)
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -159,24 +164,35 @@ class RiderProfile(models.Model):
         self.last_active_at = timezone.now()
         self.save(update_fields=['last_active_at'])
     
+    def update_location(self, latitude, longitude):
+        """Record the rider's current position"""
+        from django.utils import timezone
+        self.last_latitude = latitude
+        self.last_longitude = longitude
+        self.location_updated_at = timezone.now()
+        self.save(update_fields=['last_latitude', 'last_longitude', 'location_updated_at'])
+    
     def calculate_earnings(self, start_date=None, end_date=None):
-        """Calculate rider earnings for a date range"""
+        """
+        Calculate rider earnings for a date range.
+        
+        Sums the daily rollup, so the cost depends on the number of days in
+        the range rather than the number of deliveries. Datetimes are reduced
+        to their local date; both ends are inclusive.
+        """
         from django.db.models import Sum
         from decimal import Decimal
-        from .models import DeliveryAssignment
+        from .models import RiderDailyEarning
         
-        deliveries = DeliveryAssignment.objects.filter(
-            rider=self,
-            status='delivered'
-        )
+        days = RiderDailyEarning.objects.filter(rider=self)
         
         if start_date:
-            deliveries = deliveries.filter(delivered_at__gte=start_date)
+            days = days.filter(date__gte=RiderDailyEarning.day_of(start_date))
         if end_date:
-            deliveries = deliveries.filter(delivered_at__lte=end_date)
+            days = days.filter(date__lte=RiderDailyEarning.day_of(end_date))
         
-        total_earnings = deliveries.aggregate(
-            total=Sum('delivery_fee')
+        total_earnings = days.aggregate(
+            total=Sum('earnings')
         )['total'] or Decimal('0.00')
         
         return total_earnings
@@ -195,11 +211,21 @@ class DeliveryAssignment(models.Model):
     )
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # Archived orders leave the live table; the assignment then points at the archived copy
     order = models.ForeignKey(
         'orders.Order',
-        on_delete=models.CASCADE,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
         related_name='delivery_assignments'
     )
+    archived_order = models.ForeignKey(
+        'orders.ArchivedOrder',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='kept_assignments'
+    )
     rider = models.ForeignKey(
         RiderProfile,
         on_delete=models.CASCADE,
@@ -252,9 +278,15 @@ class DeliveryAssignment(models.Model):
         verbose_name = "Delivery Assignment"
         verbose_name_plural = "Delivery Assignments"
         ordering = ['-assigned_at']
+        indexes = [
+            # Rider active orders and earnings (rider + status)
+            models.Index(fields=['rider', 'status', 'assigned_at'], name='assign_rider_status_idx'),
+            # Rider delivery history, paginated on (assigned_at, id)
+            models.Index(fields=['rider', 'assigned_at'], name='assign_rider_assigned_idx'),
+        ]
     
     def __str__(self):
-        return f"Order #{self.order.id} - {self.rider.user.get_full_name()}"
+        return f"Order #{self.order_id or self.archived_order_id} - {self.rider.user.get_full_name()}"
     
     def get_status_display(self):
         """Get human-readable status"""
@@ -270,27 +302,19 @@ class DeliveryAssignment(models.Model):
     
     def mark_picked_up(self):
         """Mark assignment as picked up"""
-        from django.utils import timezone
-        self.status = 'picked_up'
-        self.picked_up_at = timezone.now()
-        self.save()
+        from .transitions import transition
+        transition(self, 'picked_up')
     
     def mark_delivered(self):
-        """Mark assignment as delivered"""
-        from django.utils import timezone
-        self.status = 'delivered'
-        self.delivered_at = timezone.now()
-        self.save()
-        
-        # Update rider stats
-        self.rider.total_deliveries += 1
-        self.rider.save(update_fields=['total_deliveries'])
+        """Mark assignment as delivered (does nothing if it already is)"""
+        from .transitions import transition
+        if self.status != 'delivered':
+            transition(self, 'delivered')
     
     def cancel_assignment(self, reason=""):
         """Cancel the assignment"""
-        self.status = 'cancelled'
-        self.delivery_notes = f"Cancelled: {reason}"
-        self.save()
+        from .transitions import transition
+        transition(self, 'cancelled', reason)
 
 
 class RiderEarning(models.Model):
@@ -351,3 +375,97 @@ class RiderEarning(models.Model):
     
     def __str__(self):
         return f"{self.rider.user.get_full_name()} - {self.get_warning_type_display()}"
+
+
+class RiderDailyEarning(models.Model):
+    """Deliveries and delivery fees per rider per day, kept up to date by mark_delivered"""
+    
+    rider = models.ForeignKey(
+        RiderProfile,
+        on_delete=models.CASCADE,
+        related_name='daily_earnings'
+    )
+    date = models.DateField()
+    deliveries = models.IntegerField(default=0)
+    earnings = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Rider Daily Earning"
+        verbose_name_plural = "Rider Daily Earnings"
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['rider', 'date'], name='unique_rider_daily_earning'),
+        ]
+    
+    def __str__(self):
+        return f"{self.rider_id} {self.date}: {self.earnings}"
+    
+    @staticmethod
+    def day_of(value):
+        """Local date of a datetime; dates are returned unchanged"""
+        from datetime import datetime
+        from django.utils import timezone
+        
+        if isinstance(value, datetime):
+            return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+        return value
+    
+    @classmethod
+    def record(cls, rider_id, delivered_at, amount, deliveries=1):
+        """Add a delivery (or, with negative values, remove one) to the rider's day"""
+        from django.db import IntegrityError, transaction
+        from django.db.models import F
+        
+        day = cls.day_of(delivered_at)
+        changes = {
+            'deliveries': F('deliveries') + deliveries,
+            'earnings': F('earnings') + amount,
+        }
+        if cls.objects.filter(rider_id=rider_id, date=day).update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(rider_id=rider_id, date=day, deliveries=deliveries, earnings=amount)
+        except IntegrityError:
+            # Another delivery created the day's row first
+            cls.objects.filter(rider_id=rider_id, date=day).update(**changes)
+
+
+class RiderLocation(models.Model):
+    """GPS point reported by a rider, written in bulk by riders.locations"""
+    
+    rider = models.ForeignKey(
+        RiderProfile,
+        on_delete=models.CASCADE,
+        related_name='locations'
+    )
+    assignment = models.ForeignKey(
+        DeliveryAssignment,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='locations',
+        help_text='Delivery in progress when the point was recorded'
+    )
+    latitude = models.DecimalField(max_digits=9, decimal_places=6)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6)
+    accuracy = models.FloatField(null=True, blank=True, help_text='Accuracy radius in metres')
+    speed = models.FloatField(null=True, blank=True, help_text='Speed in metres per second')
+    heading = models.FloatField(null=True, blank=True, help_text='Bearing in degrees')
+    recorded_at = models.DateTimeField(help_text='When the device took the fix')
+    received_at = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = "Rider Location"
+        verbose_name_plural = "Rider Locations"
+        ordering = ['-recorded_at']
+        indexes = [
+            # A rider's track over a time window
+            models.Index(fields=['rider', 'recorded_at'], name='rider_location_track_idx'),
+            # Route of one delivery
+            models.Index(fields=['assignment', 'recorded_at'], name='rider_location_assign_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.rider_id} @ {self.latitude},{self.longitude} ({self.recorded_at})"
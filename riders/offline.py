@@ -0,0 +1,242 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from datetime import timedelta
+import hashlib
+import json
+import uuid
+
+from core.models import IdempotencyKey
+from .locations import InvalidPoint, parse_coordinate, parse_timestamp
+from .models import DeliveryAssignment
+from .transitions import InvalidTransition, transition
+from . import presence
+
+# Largest queue the app may replay in one request
+MAX_ACTIONS = getattr(settings, 'RIDER_OFFLINE_MAX_ACTIONS', 100)
+# Applied action ids are remembered this long, so a queue replayed again is not applied twice
+ACTION_TTL = timedelta(days=getattr(settings, 'RIDER_OFFLINE_ACTION_DAYS', 7))
+ACTION_SCOPE = 'rider_offline_action'
+DELIVERY_STATUSES = ('picked_up', 'delivering', 'delivered', 'cancelled')
+
+
+class InvalidAction(ValueError):
+    """A queued action that can never be applied"""
+
+
+def action_hash(action):
+    """Hash of an action, used to reject an id reused for a different action"""
+    body = json.dumps(action, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _action_id(action):
+    if not isinstance(action, dict):
+        raise InvalidAction('Action must be an object')
+    action_id = str(action.get('id') or '').strip()
+    if not action_id:
+        raise InvalidAction('id is required')
+    if len(action_id) > 255:
+        raise InvalidAction('id must be at most 255 characters')
+    return action_id
+
+
+def _recorded_at(action, now):
+    """When the rider did it offline; never later than now"""
+    if action.get('recorded_at') in (None, ''):
+        return now
+    try:
+        return min(parse_timestamp(action['recorded_at']), now)
+    except InvalidPoint:
+        raise InvalidAction(f"Invalid recorded_at: {action['recorded_at']}")
+
+
+def _assignment_id(action):
+    try:
+        return uuid.UUID(str(action.get('assignment_id')))
+    except ValueError:
+        raise InvalidAction('Invalid assignment_id')
+
+
+class Replay:
+    """State of one replayed queue: the rider, the assignments it touches and pending profile changes"""
+
+    def __init__(self, rider, assignments):
+        self.rider = rider
+        self.assignments = assignments
+        self.profile_fields = set()
+
+    def set_online(self, action, recorded_at):
+        online = action.get('online')
+        if not isinstance(online, bool):
+            raise InvalidAction('online must be true or false')
+        if online and not self.rider.is_approved:
+            raise InvalidAction('Your account is not approved yet')
+        if online and not self.rider.is_active:
+            raise InvalidAction('Your account is suspended')
+        position = None
+        if action.get('latitude') not in (None, '') and action.get('longitude') not in (None, ''):
+            try:
+                position = (parse_coordinate(action, 'latitude', 90), parse_coordinate(action, 'longitude', 180))
+            except InvalidPoint as e:
+                raise InvalidAction(str(e))
+        if self.rider.last_active_at and recorded_at < self.rider.last_active_at:
+            # Something newer (another device, or a later action) already set the status
+            return {'result': 'stale', 'is_online': self.rider.is_online}
+
+        self.rider.is_online = online
+        self.rider.last_active_at = recorded_at
+        self.profile_fields.update(['is_online', 'last_active_at'])
+        if position and (self.rider.location_updated_at is None or recorded_at > self.rider.location_updated_at):
+            # Never replace a newer GPS fix with the position queued offline
+            self.rider.last_latitude, self.rider.last_longitude = position
+            self.rider.location_updated_at = recorded_at
+            self.profile_fields.update(['last_latitude', 'last_longitude', 'location_updated_at'])
+        return {'result': 'applied', 'is_online': online}
+
+    def update_delivery(self, action, recorded_at):
+        new_status = action.get('status')
+        if new_status not in DELIVERY_STATUSES:
+            raise InvalidAction('Invalid status')
+        assignment = self.assignments.get(_assignment_id(action))
+        if assignment is None:
+            raise InvalidAction('Delivery assignment not found')
+
+        # Keep the offline time, but never before the order was assigned
+        at = max(recorded_at, assignment.assigned_at)
+        try:
+            transition(assignment, new_status, action.get('reason', 'Cancelled by rider'), at=at)
+        except InvalidTransition as e:
+            if assignment.status == new_status:
+                # Already there, e.g. the original request got through before the signal dropped
+                return {'result': 'stale', 'assignment_status': assignment.status}
+            raise InvalidAction(str(e))
+        return {'result': 'applied', 'assignment_status': assignment.status}
+
+    def save_profile(self):
+        """One write for all the status changes in the queue, then presence to match"""
+        if not self.profile_fields:
+            return
+        self.rider.save(update_fields=sorted(self.profile_fields))
+        is_online = self.rider.is_online
+
+        def update_presence():
+            if is_online:
+                presence.heartbeat(self.rider.id)
+            else:
+                presence.clear(self.rider.id)
+
+        transaction.on_commit(update_presence)
+
+
+HANDLERS = {
+    'set_online': Replay.set_online,
+    'update_delivery': Replay.update_delivery,
+}
+
+
+def replay_actions(rider, actions, user):
+    """
+    Apply a rider's queued offline actions, in order, in one transaction.
+
+    Each action is an object with a client-generated id, a type and
+    recorded_at (when the rider did it, as accepted by parse_timestamp):
+        {'id', 'type': 'set_online', 'online', 'latitude'?, 'longitude'?}
+        {'id', 'type': 'update_delivery', 'assignment_id', 'status', 'reason'?}
+    Toggling is not replayable, so the queue records the status the rider
+    chose. An action that cannot be applied is rejected on its own without
+    failing the rest, and an action that was overtaken (a newer online
+    status, a delivery already in that status) is reported as stale. Ids
+    already seen, in this or an earlier replay, are not applied again;
+    their original result is returned with duplicate set.
+
+    Args:
+        rider: RiderProfile
+        actions: list of action dicts
+        user: The rider's user; applied ids are remembered per user
+
+    Returns:
+        list: One result per action, in order, each with id, result
+            (applied, stale or rejected) and an error or the new status
+    """
+    now = timezone.now()
+    ids = []
+    for action in actions:
+        try:
+            ids.append(_action_id(action))
+        except InvalidAction:
+            ids.append(None)
+
+    assignment_ids = set()
+    for action in actions:
+        if isinstance(action, dict) and action.get('type') == 'update_delivery':
+            try:
+                assignment_ids.add(_assignment_id(action))
+            except InvalidAction:
+                pass
+
+    results = []
+    with transaction.atomic():
+        # One lookup for ids seen before, one for every assignment the queue touches
+        seen = {
+            record.key: record
+            for record in IdempotencyKey.objects.filter(
+                user=user, scope=ACTION_SCOPE, key__in=[action_id for action_id in ids if action_id],
+                expires_at__gt=now
+            )
+        }
+        assignments = DeliveryAssignment.objects.select_related('order').filter(
+            rider=rider, id__in=assignment_ids
+        ).in_bulk() if assignment_ids else {}
+        replay = Replay(rider, assignments)
+        records = {}
+
+        for action, action_id in zip(actions, ids):
+            if action_id is None:
+                results.append({'id': None, 'result': 'rejected', 'error': 'Action must be an object with an id'})
+                continue
+
+            request_hash = action_hash(action)
+            previous = seen.get(action_id) or records.get(action_id)
+            if previous is not None:
+                if previous.request_hash != request_hash:
+                    results.append({
+                        'id': action_id,
+                        'result': 'rejected',
+                        'error': 'This id was already used for a different action'
+                    })
+                else:
+                    results.append({**json.loads(previous.response_body), 'duplicate': True})
+                continue
+
+            handler = HANDLERS.get(action.get('type'))
+            try:
+                if handler is None:
+                    raise InvalidAction(f"Unknown action type: {action.get('type')}")
+                # A savepoint per action, so one that fails midway leaves no partial writes
+                with transaction.atomic():
+                    result = {'id': action_id, **handler(replay, action, _recorded_at(action, now))}
+            except InvalidAction as e:
+                result = {'id': action_id, 'result': 'rejected', 'error': str(e)}
+            results.append(result)
+
+            records[action_id] = IdempotencyKey(
+                user=user,
+                scope=ACTION_SCOPE,
+                key=action_id,
+                request_hash=request_hash,
+                status='completed',
+                response_status=200,
+                response_body=json.dumps(result, cls=DjangoJSONEncoder),
+                expires_at=now + ACTION_TTL
+            )
+
+        replay.save_profile()
+        # Expired records for the same ids are replaced rather than colliding on the unique key
+        IdempotencyKey.objects.filter(
+            user=user, scope=ACTION_SCOPE, key__in=list(records), expires_at__lte=now
+        ).delete()
+        IdempotencyKey.objects.bulk_create(records.values())
+
+    return results
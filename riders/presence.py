@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from datetime import datetime, timezone as dt_timezone
+
+from core.versions import is_shared_cache
+
+# A rider who has not sent a heartbeat for this long is considered gone
+PRESENCE_TTL = getattr(settings, 'RIDER_PRESENCE_TTL', 90)
+
+
+def presence_key(rider_id):
+    return f'rider_presence_{rider_id}'
+
+
+def heartbeat(rider_id):
+    """Record that the rider's app is alive; a cache write only, nothing in the database"""
+    cache.set(presence_key(rider_id), timezone.now().timestamp(), PRESENCE_TTL)
+
+
+def clear(rider_id):
+    """Forget a rider's presence, e.g. when they go offline"""
+    cache.delete(presence_key(rider_id))
+
+
+def last_seen(rider_ids):
+    """
+    When each rider last sent a heartbeat, with one cache round trip.
+
+    Returns:
+        dict: rider id -> aware datetime, for riders seen within PRESENCE_TTL
+    """
+    keys = {presence_key(rider_id): rider_id for rider_id in rider_ids}
+    found = cache.get_many(list(keys))
+    return {
+        keys[key]: datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+        for key, timestamp in found.items()
+    }
+
+
+def alive(rider_ids):
+    """
+    The subset of rider_ids with a live heartbeat.
+
+    Without a shared cache this process cannot see heartbeats sent to other
+    workers, so every rider is assumed alive and is_online alone decides.
+    """
+    rider_ids = list(rider_ids)
+    if not rider_ids or not is_shared_cache():
+        return set(rider_ids)
+    return set(last_seen(rider_ids))
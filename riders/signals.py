@@ -1,14 +1,18 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_init, post_save, post_delete
 from django.dispatch import receiver
 from django.db.models.signals import pre_save
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
 from django.conf import settings
-from django.template.loader import render_to_string
+from django.db.models import F
 from django.utils import timezone
 
-from .models import RiderProfile, DeliveryAssignment
+from .models import RiderProfile, DeliveryAssignment, RiderDailyEarning
+from .transitions import status_changed
+from .dispatch import riders_for_order, sync_rider
+from .feeds import earnings_changed, orders_changed
+from . import events
 from orders.models import Order
+from core import outbox
 
 
 User = get_user_model()
@@ -49,6 +53,12 @@ def update_user_approval_status(sender, instance, **kwargs):
             user.save(update_fields=['approval_status', 'is_approved'])
 
 
+@receiver(post_save, sender=RiderProfile)
+def sync_rider_dispatch_grid(sender, instance, **kwargs):
+    """Keep this process's dispatch grid in step with rider status and position"""
+    sync_rider(instance)
+
+
 @receiver(post_save, sender=DeliveryAssignment)
 def handle_delivery_assignment_created(sender, instance, created, **kwargs):
     """Handle actions when delivery assignment is created"""
@@ -72,24 +82,91 @@ def handle_delivery_assignment_created(sender, instance, created, **kwargs):
                 print(f"Error sending rider notification: {e}")
 
 
+@receiver(post_init, sender=DeliveryAssignment)
+def remember_loaded_status(sender, instance, **kwargs):
+    """Status as loaded, so a plain save() can tell whether it changed without another query"""
+    instance._loaded_status = instance.__dict__.get('status')
+
+
 @receiver(post_save, sender=DeliveryAssignment)
-def handle_delivery_status_change(sender, instance, **kwargs):
-    """Handle actions when delivery status changes"""
-    if instance.status == 'delivered':
-        # Update order status
-        order = instance.order
-        order.status = 'delivered'
-        order.save(update_fields=['status'])
+def send_status_changed_on_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Fallback for code that sets status and calls save() instead of going
+    through transition(), so earnings, notifications and feeds still follow
+    """
+    old_status = instance._loaded_status
+    instance._loaded_status = instance.status
+    if created or raw or old_status is None or old_status == instance.status:
+        return
+    status_changed.send(
+        sender=DeliveryAssignment,
+        assignment=instance,
+        old_status=old_status,
+        new_status=instance.status
+    )
+
+
+@receiver(status_changed, sender=DeliveryAssignment)
+def handle_delivery_status_change(sender, assignment, old_status, new_status, **kwargs):
+    """Handle actions when delivery status changes (once per transition)"""
+    if new_status == 'delivered':
+        # Update rider stats
+        RiderDailyEarning.record(assignment.rider_id, assignment.delivered_at, assignment.delivery_fee)
+        RiderProfile.objects.filter(pk=assignment.rider_id).update(total_deliveries=F('total_deliveries') + 1)
+        earnings_changed(assignment.rider_id)
         
         # Send notification to customer
         try:
             send_customer_delivery_notification(
-                order=order,
-                rider=instance.rider,
-                template='riders emails/order_delivered_notification.html'
+                order=assignment.order,
+                rider=assignment.rider,
+                template='riders/emails/order_delivered_notification.html'
             )
         except Exception as e:
             print(f"Error sending customer notification: {e}")
+    
+    elif old_status == 'delivered':
+        # A cancelled delivery comes back out of the earnings rollup and the rider's count
+        RiderDailyEarning.record(assignment.rider_id, assignment.delivered_at, -assignment.delivery_fee, deliveries=-1)
+        RiderProfile.objects.filter(pk=assignment.rider_id).update(total_deliveries=F('total_deliveries') - 1)
+        earnings_changed(assignment.rider_id)
+
+
+@receiver(status_changed, sender=DeliveryAssignment)
+def announce_delivery_status_change(sender, assignment, **kwargs):
+    """Transitions are written with update(), so refresh feeds and push the event here"""
+    orders_changed(assignment.rider_id)
+    events.assignment_updated(assignment)
+
+
+@receiver(post_save, sender=DeliveryAssignment)
+@receiver(post_delete, sender=DeliveryAssignment)
+def invalidate_assignment_feeds(sender, instance, **kwargs):
+    """An assignment changes both the open order pool and its rider's active orders"""
+    orders_changed(instance.rider_id)
+
+
+@receiver(post_save, sender=DeliveryAssignment)
+def publish_assignment_events(sender, instance, created, **kwargs):
+    """Push assignment changes to connected rider apps"""
+    if created:
+        events.order_claimed(instance)
+    events.assignment_updated(instance)
+
+
+@receiver(post_save, sender=Order)
+def invalidate_order_feeds(sender, instance, created, **kwargs):
+    """Order changes show up in the available feed and in any assigned rider's active feed"""
+    rider_ids = []
+    if not created:
+        rider_ids = DeliveryAssignment.objects.filter(order=instance).values_list('rider_id', flat=True)
+    orders_changed(*rider_ids)
+
+
+@receiver(post_delete, sender=Order)
+def invalidate_deleted_order_feeds(sender, instance, **kwargs):
+    """Deleted orders leave the available feed; their assignments bump the riders' feeds"""
+    orders_changed()
 
 
 @receiver(post_save, sender=Order)
@@ -99,86 +176,66 @@ def handle_order_ready_for_delivery(sender, instance, created, **kwargs):
         # Check if order has existing assignment
         if not hasattr(instance, 'delivery_assignments') or not instance.delivery_assignments.exists():
             # Order is ready but not assigned, notify available riders
+            events.order_ready(instance)
             notify_available_riders(instance)
 
 
+def admin_emails():
+    """Addresses that receive rider admin notifications"""
+    admin_email = getattr(settings, 'ADMIN_EMAIL', None)
+    if admin_email:
+        return [admin_email]
+    return [email for _, email in settings.ADMINS]
+
+
 def send_admin_notification(subject, message, template=None, context=None):
-    """Send notification to admin about rider activities"""
+    """Queue a notification to admin about rider activities"""
     try:
-        if template:
-            html_message = render_to_string(template, context)
-        else:
-            html_message = message
-        
-        send_mail(
-            subject=subject,
-            message=message,
-            html_message=html_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[settings.ADMIN_EMAIL],
-            fail_silently=False
-        )
+        outbox.enqueue_email(subject, message, admin_emails(), template, context)
     except Exception as e:
         print(f"Error sending admin notification: {e}")
 
 
 def send_rider_notification(rider, subject, message, template=None, context=None):
-    """Send notification to rider"""
+    """Queue a notification to rider"""
     try:
-        if template:
-            html_message = render_to_string(template, context)
-        else:
-            html_message = message
-        
-        send_mail(
-            subject=subject,
-            message=message,
-            html_message=html_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[rider.user.email],
-            fail_silently=False
-        )
+        outbox.enqueue_email(subject, message, [rider.user.email], template, context)
     except Exception as e:
         print(f"Error sending rider notification: {e}")
 
 
 def send_customer_delivery_notification(order, rider, template=None):
-    """Send notification to customer about delivery"""
+    """Queue a notification to customer about delivery"""
     try:
-        if template:
-            html_message = render_to_string(template, {'order': order, 'rider': rider})
-        else:
-            html_message = f"Your order #{order.id} has been delivered by {rider.user.get_full_name()}."
-        
-        send_mail(
+        outbox.enqueue_email(
             subject=f'Order #{order.id} Delivered',
             message=f'Your order #{order.id} has been successfully delivered.',
-            html_message=html_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[order.customer.email],
-            fail_silently=False
+            recipients=[order.customer.email],
+            template=template,
+            context={'order': order, 'rider': rider}
         )
     except Exception as e:
         print(f"Error sending customer notification: {e}")
 
 
 def notify_available_riders(order):
-    """Notify available riders about new order"""
+    """
+    Notify the riders nearest to the restaurant about a new order
+    
+    Queues a single email for all of them; process_outbox renders it once
+    and sends it over one connection, so marking an order ready does not
+    wait on SMTP.
+    """
     try:
-        # Get all approved and online riders
-        available_riders = RiderProfile.objects.filter(
-            is_approved=True,
-            is_online=True,
-            is_active=True
+        riders = [rider for rider, distance in riders_for_order(order)]
+        if not riders:
+            return
+        outbox.enqueue_email(
+            subject=f'New Order Available: #{order.id}',
+            message=f'A new order is ready for pickup: {order.restaurant.name}',
+            recipients=[rider.user.email for rider in riders],
+            template='riders/emails/available_order_notification.html',
+            context={'order': order}
         )
-        
-        for rider in available_riders:
-            send_rider_notification(
-                rider=rider,
-                subject=f'New Order Available: #{order.id}',
-                message=f'A new order is ready for pickup: {order.restaurant.name}',
-                template='riders/emails/available_order_notification.html',
-                context={'order': order}
-            )
     except Exception as e:
         print(f"Error notifying available riders: {e}")
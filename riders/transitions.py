@@ -0,0 +1,84 @@
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import DeliveryAssignment
+
+# Statuses each status may move to; cancelled and failed are final, and
+# cancelling a delivered assignment is allowed as a correction
+TRANSITIONS = {
+    'assigned': {'picked_up', 'delivering', 'delivered', 'cancelled', 'failed'},
+    'picked_up': {'delivering', 'delivered', 'cancelled', 'failed'},
+    'delivering': {'delivered', 'cancelled', 'failed'},
+    'delivered': {'cancelled'},
+    'cancelled': set(),
+    'failed': set(),
+}
+
+# Sent once per transition, inside its transaction, with
+# assignment, old_status and new_status
+status_changed = Signal()
+
+
+class InvalidTransition(ValueError):
+    """The requested status change is not allowed from the assignment's current status"""
+
+
+def transition(assignment, new_status, reason='', at=None):
+    """
+    Move a delivery assignment to a new status.
+
+    Validates the change, writes only the columns it touches in one
+    conditional UPDATE (which also stops two concurrent updates from both
+    applying), marks the order delivered when the delivery is, and sends
+    status_changed once. Side effects such as earnings, notifications and
+    feed updates hang off that signal instead of off every save().
+
+    Args:
+        assignment: DeliveryAssignment - Updated in place
+        new_status: str - Target status
+        reason: str - Recorded in delivery_notes when cancelling
+        at: datetime - When it happened, for changes made offline and
+            replayed later (default now)
+
+    Raises:
+        InvalidTransition: if the change is not allowed, or the assignment
+            changed status since it was loaded
+    """
+    old_status = assignment.status
+    if new_status not in TRANSITIONS.get(old_status, ()):
+        raise InvalidTransition(f'Cannot change a {old_status} delivery to {new_status}')
+
+    now = timezone.now()
+    at = at or now
+    changes = {'status': new_status, 'updated_at': now}
+    if new_status == 'picked_up':
+        changes['picked_up_at'] = at
+    elif new_status == 'delivered':
+        changes['delivered_at'] = at
+    elif new_status == 'cancelled':
+        changes['delivery_notes'] = f"Cancelled: {reason}"
+
+    with transaction.atomic():
+        updated = DeliveryAssignment.objects.filter(pk=assignment.pk, status=old_status).update(**changes)
+        if not updated:
+            raise InvalidTransition('This delivery was updated by another request, reload it and try again')
+
+        for field, value in changes.items():
+            setattr(assignment, field, value)
+        # A later save() of this instance must not report the change again
+        assignment._loaded_status = new_status
+
+        if new_status == 'delivered' and assignment.order_id:
+            order = assignment.order
+            order.status = 'delivered'
+            order.save(update_fields=['status', 'updated_at'])
+
+        status_changed.send(
+            sender=DeliveryAssignment,
+            assignment=assignment,
+            old_status=old_status,
+            new_status=new_status
+        )
+
+    return assignment
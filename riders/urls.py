@@ -1,5 +1,6 @@
 from django.urls import path
 from . import views
+from . import views_events
 
 app_name = 'riders'
 
@@ -12,14 +13,19 @@ urlpatterns = [
     path('profile/', views.get_rider_profile, name='get_rider_profile'),
     path('profile/create/', views.create_rider_profile, name='create_rider_profile'),
     path('toggle-online/', views.toggle_online_status, name='toggle_online_status'),
+    path('heartbeat/', views.rider_heartbeat, name='rider_heartbeat'),
+    path('locations/', views.rider_locations, name='rider_locations'),
+    path('events/', views_events.rider_events, name='rider_events'),
     
     # Order management
     path('available-orders/', views.get_available_orders, name='get_available_orders'),
     path('active-orders/', views.get_active_orders, name='get_active_orders'),
-    path('accept-order/<int:order_id>/', views.accept_order, name='accept_order'),
+    path('accept-order/<uuid:order_id>/', views.accept_order, name='accept_order'),
     path('update-delivery/<uuid:assignment_id>/', views.update_delivery_status, name='update_delivery_status'),
+    path('offline-actions/', views.replay_offline_actions, name='replay_offline_actions'),
     
     # Analytics
     path('earnings/', views.get_rider_earnings, name='get_rider_earnings'),
+    path('bootstrap/', views.rider_bootstrap, name='rider_bootstrap'),
     path('delivery-history/', views.get_delivery_history, name='get_delivery_history'),
 ]
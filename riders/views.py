@@ -3,7 +3,8 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils.decorators import method_decorator
-from django.db.models import Q
+from django.db import IntegrityError
+from django.db.models import Q, Sum
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import authenticate, login, get_user_model
 from django.conf import settings
@@ -15,10 +16,20 @@ from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from rest_framework import status
 from decimal import Decimal
+from datetime import date, datetime, time, timedelta
 
-from orders.models import Order
-from .models import RiderProfile, DeliveryAssignment
+from orders.models import Order, order_number_q
+from .models import RiderProfile, DeliveryAssignment, RiderDailyEarning
 from core.utils import get_delivery_fee, get_commission_rate, get_tax_rate
+from core.pagination import CursorPaginator, InvalidCursor
+from core.idempotency import idempotent
+from .locations import FLUSH_SECONDS, MAX_BATCH_POINTS, BufferFull, get_latest_location, ingest
+from .feeds import AVAILABLE_ORDERS, active_orders_feed, earnings_feed
+from .dispatch import claim_order
+from .transitions import InvalidTransition, transition
+from .offline import MAX_ACTIONS, replay_actions
+from . import presence
+from core.versions import content_etag, make_etag, not_modified, set_etag
 from django.contrib.auth import get_user_model
 User = get_user_model()
 import json
@@ -48,15 +59,26 @@ def toggle_online_status(request):
         # Toggle online status
         old_status = rider.is_online
         rider.is_online = not rider.is_online
-        rider.update_last_active()
+        rider.last_active_at = timezone.now()
+        update_fields = ['is_online', 'last_active_at']
         
         print(f"DEBUG: Rider {rider.user.username} status changing from {old_status} to {rider.is_online}")
         
-        rider.save()  # Save the changes to database
-        
-        # Verify the save worked by refreshing from database
-        rider.refresh_from_db()
-        print(f"DEBUG: After save, rider status in database: {rider.is_online}")
+        # Going online with a position puts the rider straight onto the dispatch grid
+        latitude = request.data.get('latitude')
+        longitude = request.data.get('longitude')
+        if latitude not in (None, '') and longitude not in (None, ''):
+            rider.last_latitude = latitude
+            rider.last_longitude = longitude
+            rider.location_updated_at = rider.last_active_at
+            update_fields += ['last_latitude', 'last_longitude', 'location_updated_at']
+        
+        # One write; presence from here on is kept by heartbeats in the cache
+        rider.save(update_fields=update_fields)
+        if rider.is_online:
+            presence.heartbeat(rider.id)
+        else:
+            presence.clear(rider.id)
         
         return JsonResponse({
             'success': True,
@@ -80,40 +102,45 @@ def toggle_online_status(request):
         }, status=500)
 
 
+def _profile_data(rider):
+    """Profile fields the app shows"""
+    return {
+        'id': str(rider.id),
+        'user': {
+            'id': rider.user.id,
+            'username': rider.user.username,
+            'email': rider.user.email,
+            'first_name': rider.user.first_name,
+            'last_name': rider.user.last_name,
+            'phone': getattr(rider.user, 'phone', ''),
+            'is_approved': rider.is_approved,
+            'approval_status': rider.approval_status,
+            'user_type': 'rider'
+        },
+        'id_number': rider.id_number,
+        'vehicle_type': rider.vehicle_type,
+        'vehicle_number': rider.vehicle_number,
+        'emergency_contact': rider.emergency_contact,
+        'bank_account': rider.bank_account,
+        'bank_name': rider.bank_name,
+        'delivery_areas': rider.delivery_areas,
+        'rating': float(rider.rating),
+        'total_deliveries': rider.total_deliveries,
+        'is_online': rider.is_online,
+        'is_active': rider.is_active,
+        'created_at': rider.created_at.isoformat(),
+        'last_active_at': rider.last_active_at.isoformat() if rider.last_active_at else None
+    }
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_rider_profile(request):
     """Get current rider's profile"""
     try:
-        rider = get_object_or_404(RiderProfile, user=request.user)
+        rider = get_object_or_404(RiderProfile.objects.select_related('user'), user=request.user)
         
-        profile_data = {
-            'id': str(rider.id),
-            'user': {
-                'id': rider.user.id,
-                'username': rider.user.username,
-                'email': rider.user.email,
-                'first_name': rider.user.first_name,
-                'last_name': rider.user.last_name,
-                'phone': getattr(rider.user, 'phone', ''),
-                'is_approved': rider.is_approved,
-                'approval_status': rider.approval_status,
-                'user_type': 'rider'
-            },
-            'id_number': rider.id_number,
-            'vehicle_type': rider.vehicle_type,
-            'vehicle_number': rider.vehicle_number,
-            'emergency_contact': rider.emergency_contact,
-            'bank_account': rider.bank_account,
-            'bank_name': rider.bank_name,
-            'delivery_areas': rider.delivery_areas,
-            'rating': float(rider.rating),
-            'total_deliveries': rider.total_deliveries,
-            'is_online': rider.is_online,
-            'is_active': rider.is_active,
-            'created_at': rider.created_at.isoformat(),
-            'last_active_at': rider.last_active_at.isoformat() if rider.last_active_at else None
-        }
+        profile_data = _profile_data(rider)
         
         return Response(profile_data)
         
@@ -170,6 +197,181 @@ def create_rider_profile(request):
         }, status=500)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def rider_heartbeat(request):
+    """
+    Tell the server the rider app is still running.
+    
+    Only touches the cache. Riders whose heartbeats stop are taken offline
+    by the sweep_offline_riders command; is_online in the response lets the
+    app notice that and ask the rider to go online again.
+    """
+    try:
+        status_row = RiderProfile.objects.filter(user=request.user).values('id', 'is_online').first()
+        if status_row is None:
+            return Response({
+                'error': 'Rider profile not found'
+            }, status=404)
+        
+        if status_row['is_online']:
+            presence.heartbeat(status_row['id'])
+        
+        return Response({
+            'is_online': status_row['is_online'],
+            'interval': presence.PRESENCE_TTL // 3
+        })
+        
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=500)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def replay_offline_actions(request):
+    """
+    Apply the actions the app queued while it had no signal, in one request.
+    
+    Body: {'actions': [...]} in the order the rider did them (see
+    offline.replay_actions). Responds 200 with a result per action even if
+    some were rejected; 409 means another replay of the same queue was
+    running, so retry it.
+    """
+    try:
+        rider = get_object_or_404(RiderProfile, user=request.user)
+        
+        actions = request.data.get('actions') if isinstance(request.data, dict) else None
+        if not isinstance(actions, list) or not actions:
+            return Response({
+                'error': 'actions must be a non-empty list'
+            }, status=400)
+        
+        if len(actions) > MAX_ACTIONS:
+            return Response({
+                'error': f'At most {MAX_ACTIONS} actions per request'
+            }, status=400)
+        
+        try:
+            results = replay_actions(rider, actions, request.user)
+        except IntegrityError:
+            return Response({
+                'error': 'These actions are already being replayed'
+            }, status=409)
+        
+        return Response({
+            'results': results,
+            'is_online': rider.is_online
+        })
+        
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=500)
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def rider_locations(request):
+    """
+    Report a batch of GPS points (POST) or read the rider's latest position (GET).
+
+    POST body: {"points": [{"latitude", "longitude", "recorded_at", "accuracy",
+    "speed", "heading"}, ...]}, recorded_at as ISO 8601 or Unix time. Points
+    are buffered and written in bulk, so the response only confirms receipt.
+    """
+    try:
+        rider = get_object_or_404(RiderProfile.objects.select_related('user'), user=request.user)
+        
+        if request.method == 'GET':
+            return Response({'location': get_latest_location(rider)})
+        
+        if not rider.is_approved or not rider.is_active:
+            return Response({
+                'error': 'Only approved, active riders can report locations'
+            }, status=403)
+        
+        points = request.data.get('points') if isinstance(request.data, dict) else request.data
+        if not isinstance(points, list) or not points:
+            return Response({
+                'error': 'points must be a non-empty list'
+            }, status=400)
+        if len(points) > MAX_BATCH_POINTS:
+            return Response({
+                'error': f'At most {MAX_BATCH_POINTS} points per batch'
+            }, status=400)
+        
+        try:
+            accepted, rejected = ingest(rider, points)
+        except BufferFull:
+            return Response({
+                'error': 'Too many locations waiting to be saved, send this batch again shortly'
+            }, status=429, headers={'Retry-After': str(FLUSH_SECONDS)})
+        
+        return Response({
+            'accepted': accepted,
+            'rejected': rejected
+        }, status=202 if accepted else 400)
+        
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=500)
+
+
+def _available_orders_data(number_q=None):
+    """Ready, unassigned orders, oldest first, optionally filtered by order number"""
+    # Get orders that are ready for delivery and not assigned
+    available_orders = Order.objects.filter(
+        status='ready',
+        delivery_assignments__isnull=True
+    ).select_related(
+        'customer', 'restaurant'
+    ).order_by('created_at')
+    
+    if number_q is not None:
+        available_orders = available_orders.filter(number_q)
+    
+    orders_data = []
+    charges = None
+    for order in available_orders:
+        if order.grand_total is None:
+            # Orders from before charges were snapshotted: read the settings once, not per order
+            if charges is None:
+                charges = (get_delivery_fee(), get_tax_rate())
+            order.apply_charges(*charges)
+        # Delivery fee as snapshotted at checkout
+        delivery_fee = order.delivery_fee
+        
+        orders_data.append({
+            'id': order.id,
+            'order_number': order.order_number,
+            'customer': {
+                'id': order.customer.id,
+                'first_name': order.customer.first_name,
+                'last_name': order.customer.last_name,
+                'phone': getattr(order.customer, 'phone', ''),
+                'email': order.customer.email
+            },
+            'restaurant': {
+                'id': order.restaurant.id,
+                'name': order.restaurant.name,
+                'address': order.restaurant.address,
+                'phone': getattr(order.restaurant, 'phone', '')
+            },
+            'delivery_address': order.delivery_address,
+            'phone': order.phone,
+            'special_instructions': order.notes or '',
+            'total_amount': float(order.total_amount),
+            'delivery_fee': float(delivery_fee),
+            'created_at': order.created_at.isoformat(),
+            'estimated_delivery_time': '30-45 minutes'
+        })
+    
+    return orders_data
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_available_orders(request):
@@ -188,45 +390,25 @@ def get_available_orders(request):
                 'error': 'You must be online to view available orders'
             }, status=403)
         
-        # Get orders that are ready for delivery and not assigned
-        available_orders = Order.objects.filter(
-            status='ready',
-            delivery_assignments__isnull=True
-        ).select_related(
-            'customer', 'restaurant'
-        ).order_by('created_at')
-        
-        orders_data = []
-        for order in available_orders:
-            # Calculate delivery fee
-            delivery_fee = get_delivery_fee()
-            
-            orders_data.append({
-                'id': order.id,
-                'order_number': order.order_number,
-                'customer': {
-                    'id': order.customer.id,
-                    'first_name': order.customer.first_name,
-                    'last_name': order.customer.last_name,
-                    'phone': getattr(order.customer, 'phone', ''),
-                    'email': order.customer.email
-                },
-                'restaurant': {
-                    'id': order.restaurant.id,
-                    'name': order.restaurant.name,
-                    'address': order.restaurant.address,
-                    'phone': getattr(order.restaurant, 'phone', '')
-                },
-                'delivery_address': order.delivery_address,
-                'phone': order.phone,
-                'special_instructions': order.notes or '',
-                'total_amount': float(order.total_amount),
-                'delivery_fee': float(delivery_fee),
-                'created_at': order.created_at.isoformat(),
-                'estimated_delivery_time': '30-45 minutes'
-            })
+        # Nothing changed since the app's last poll: answer from the version alone
+        etag = make_etag(AVAILABLE_ORDERS, request.GET.get('order_number', ''))
+        unchanged = not_modified(request, etag)
+        if unchanged:
+            return unchanged
+        
+        # Optional exact or prefix match on the indexed order number
+        number_q = None
+        order_number = request.GET.get('order_number')
+        if order_number:
+            number_q = order_number_q(order_number)
+            if number_q is None:
+                return Response({
+                    'error': 'Invalid order number'
+                }, status=400)
         
-        return Response(orders_data)
+        orders_data = _available_orders_data(number_q)
+        
+        return set_etag(Response(orders_data), etag)
         
     except RiderProfile.DoesNotExist:
         return Response({
@@ -238,6 +420,44 @@ def get_available_orders(request):
         }, status=500)
 
 
+def _active_orders_data(rider):
+    """The rider's assignments still in progress, newest first"""
+    active_assignments = DeliveryAssignment.objects.filter(
+        rider=rider,
+        status__in=['assigned', 'picked_up', 'delivering']
+    ).select_related(
+        'order', 'order__customer', 'order__restaurant'
+    ).order_by('-assigned_at')
+    
+    assignments_data = []
+    for assignment in active_assignments:
+        assignments_data.append({
+            'id': str(assignment.id),
+            'order': {
+                'id': assignment.order.id,
+                'order_number': assignment.order.order_number,
+                'customer': {
+                    'first_name': assignment.order.customer.first_name,
+                    'last_name': assignment.order.customer.last_name,
+                    'phone': getattr(assignment.order.customer, 'phone', '')
+                },
+                'restaurant': {
+                    'name': assignment.order.restaurant.name,
+                    'address': assignment.order.restaurant.address
+                },
+                'delivery_address': assignment.order.delivery_address,
+                'total_amount': float(assignment.order.total_amount),
+                'delivery_fee': float(assignment.delivery_fee)
+            },
+            'status': assignment.status,
+            'assigned_at': assignment.assigned_at.isoformat(),
+            'picked_up_at': assignment.picked_up_at.isoformat() if assignment.picked_up_at else None,
+            'delivery_fee': float(assignment.delivery_fee)
+        })
+    
+    return assignments_data
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_active_orders(request):
@@ -245,40 +465,14 @@ def get_active_orders(request):
     try:
         rider = get_object_or_404(RiderProfile, user=request.user)
         
-        active_assignments = DeliveryAssignment.objects.filter(
-            rider=rider,
-            status__in=['assigned', 'picked_up', 'delivering']
-        ).select_related(
-            'order', 'order__customer', 'order__restaurant'
-        ).order_by('-assigned_at')
+        etag = make_etag(active_orders_feed(rider.id))
+        unchanged = not_modified(request, etag)
+        if unchanged:
+            return unchanged
         
-        assignments_data = []
-        for assignment in active_assignments:
-            assignments_data.append({
-                'id': str(assignment.id),
-                'order': {
-                    'id': assignment.order.id,
-                    'order_number': assignment.order.order_number,
-                    'customer': {
-                        'first_name': assignment.order.customer.first_name,
-                        'last_name': assignment.order.customer.last_name,
-                        'phone': getattr(assignment.order.customer, 'phone', '')
-                    },
-                    'restaurant': {
-                        'name': assignment.order.restaurant.name,
-                        'address': assignment.order.restaurant.address
-                    },
-                    'delivery_address': assignment.order.delivery_address,
-                    'total_amount': float(assignment.order.total_amount),
-                    'delivery_fee': float(assignment.delivery_fee)
-                },
-                'status': assignment.status,
-                'assigned_at': assignment.assigned_at.isoformat(),
-                'picked_up_at': assignment.picked_up_at.isoformat() if assignment.picked_up_at else None,
-                'delivery_fee': float(assignment.delivery_fee)
-            })
+        assignments_data = _active_orders_data(rider)
         
-        return Response(assignments_data)
+        return set_etag(Response(assignments_data), etag)
         
     except RiderProfile.DoesNotExist:
         return Response({
@@ -292,11 +486,11 @@ def get_active_orders(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent('accept_order')
 def accept_order(request, order_id):
     """Accept a delivery order"""
     try:
         rider = get_object_or_404(RiderProfile, user=request.user)
-        order = get_object_or_404(Order, id=order_id)
         
         # Check if rider is approved and online
         if not rider.is_approved:
@@ -309,32 +503,23 @@ def accept_order(request, order_id):
                 'error': 'You must be online to accept orders'
             }, status=403)
         
+        order = get_object_or_404(Order, id=order_id)
+        
         # Check if order is still available
         if order.status != 'ready':
             return Response({
                 'error': 'Order is no longer available for delivery'
-            }, status=400)
+            }, status=409)
+        
+        # Delivery fee as snapshotted at checkout
+        delivery_fee = order.ensure_charges().delivery_fee
         
-        # Check if order is already assigned
-        if DeliveryAssignment.objects.filter(order=order, status__in=['assigned', 'picked_up', 'delivering']).exists():
+        # Only one of several riders tapping the same order wins the claim
+        assignment = claim_order(order, rider, delivery_fee=delivery_fee)
+        if assignment is None:
             return Response({
                 'error': 'Order is already assigned to another rider'
-            }, status=400)
-        
-        # Calculate delivery fee
-        delivery_fee = get_delivery_fee()
-        
-        # Create delivery assignment
-        assignment = DeliveryAssignment.objects.create(
-            order=order,
-            rider=rider,
-            status='assigned',
-            delivery_fee=delivery_fee
-        )
-        
-        # Update order status
-        order.status = 'delivering'
-        order.save()
+            }, status=409)
         
         return Response({
             'success': True,
@@ -360,7 +545,9 @@ def update_delivery_status(request, assignment_id):
     """Update delivery assignment status"""
     try:
         rider = get_object_or_404(RiderProfile, user=request.user)
-        assignment = get_object_or_404(DeliveryAssignment, id=assignment_id, rider=rider)
+        assignment = get_object_or_404(
+            DeliveryAssignment.objects.select_related('order'), id=assignment_id, rider=rider
+        )
         
         data = json.loads(request.body)
         new_status = data.get('status')
@@ -370,17 +557,14 @@ def update_delivery_status(request, assignment_id):
                 'error': 'Invalid status'
             }, status=400)
         
-        # Update status
-        assignment.status = new_status
-        
-        if new_status == 'picked_up':
-            assignment.mark_picked_up()
-        elif new_status == 'delivered':
-            assignment.mark_delivered()
-        elif new_status == 'cancelled':
-            assignment.cancel_assignment(data.get('reason', 'Cancelled by rider'))
-        
-        assignment.save()
+        # One conditional write for the assignment (plus the order when delivered)
+        try:
+            transition(assignment, new_status, data.get('reason', 'Cancelled by rider'))
+        except InvalidTransition as e:
+            return Response({
+                'error': str(e),
+                'status': assignment.status
+            }, status=409)
         
         return Response({
             'success': True,
@@ -394,6 +578,35 @@ def update_delivery_status(request, assignment_id):
         }, status=500)
 
 
+def _earnings_data(rider):
+    """Earnings totals for today, this week, this month and all time"""
+    # Calculate earnings for different periods
+    today = timezone.localdate()
+    this_week_start = today - timedelta(days=today.weekday())
+    this_month_start = today.replace(day=1)
+    
+    # One query over the daily rollup (one row per day worked), not every delivery
+    zero = Decimal('0.00')
+    earnings = RiderDailyEarning.objects.filter(rider=rider).aggregate(
+        total_earnings=Sum('earnings', default=zero),
+        total_deliveries=Sum('deliveries', default=0),
+        today_earnings=Sum('earnings', filter=Q(date=today), default=zero),
+        week_earnings=Sum('earnings', filter=Q(date__gte=this_week_start), default=zero),
+        month_earnings=Sum('earnings', filter=Q(date__gte=this_month_start), default=zero)
+    )
+    total_earnings = earnings['total_earnings']
+    total_deliveries = earnings['total_deliveries']
+    
+    return {
+        'total_earnings': float(total_earnings),
+        'total_deliveries': total_deliveries,
+        'today_earnings': float(earnings['today_earnings']),
+        'week_earnings': float(earnings['week_earnings']),
+        'month_earnings': float(earnings['month_earnings']),
+        'average_per_delivery': float(total_earnings / total_deliveries) if total_deliveries > 0 else 0.0
+    }
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_rider_earnings(request):
@@ -401,97 +614,190 @@ def get_rider_earnings(request):
     try:
         rider = get_object_or_404(RiderProfile, user=request.user)
         
-        # Calculate earnings from completed deliveries
-        completed_assignments = DeliveryAssignment.objects.filter(
-            rider=rider,
-            status='delivered'
-        )
-        
-        total_earnings = sum(assignment.delivery_fee for assignment in completed_assignments)
-        total_deliveries = completed_assignments.count()
-        
-        # Calculate earnings for different periods
-        from datetime import datetime, timedelta
+        etag = make_etag(earnings_feed(rider.id), timezone.localdate())
+        unchanged = not_modified(request, etag)
+        if unchanged:
+            return unchanged
         
-        today = timezone.now().date()
-        this_week_start = today - timedelta(days=today.weekday())
-        this_month_start = today.replace(day=1)
+        return set_etag(Response(_earnings_data(rider)), etag)
         
-        today_earnings = sum(
-            assignment.delivery_fee 
-            for assignment in completed_assignments
-            if assignment.delivered_at and assignment.delivered_at.date() == today
-        )
-        
-        week_earnings = sum(
-            assignment.delivery_fee 
-            for assignment in completed_assignments
-            if assignment.delivered_at and assignment.delivered_at.date() >= this_week_start
-        )
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=500)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def rider_bootstrap(request):
+    """
+    Everything the app loads at startup in one round trip.
+    
+    Returns the profile, active orders, earnings and (for approved, online
+    riders) available orders, each as {'etag', 'data'}. Each section's ETag
+    is the one its own endpoint sends, so the app can pass the ETags it holds
+    back as query params (?profile=...&active_orders=...&earnings=...&available_orders=...);
+    a section that has not changed comes back as {'etag', 'not_modified': true}
+    and costs no query. The whole response also has an ETag for If-None-Match.
+    Sections built from change versions have a null ETag, and are always
+    sent, when the cache is not shared between workers.
+    """
+    try:
+        rider = get_object_or_404(RiderProfile.objects.select_related('user'), user=request.user)
+        
+        # Versions are read before any data so a change made meanwhile shows up on the next call
+        profile_data = _profile_data(rider)
+        sections = {
+            'profile': (content_etag('rider_profile', profile_data), lambda: profile_data),
+            'active_orders': (make_etag(active_orders_feed(rider.id)), lambda: _active_orders_data(rider)),
+            'earnings': (make_etag(earnings_feed(rider.id), timezone.localdate()), lambda: _earnings_data(rider)),
+        }
+        if rider.is_approved and rider.is_online:
+            # Same parts as an unfiltered get_available_orders, so the ETags are interchangeable
+            sections['available_orders'] = (make_etag(AVAILABLE_ORDERS, ''), _available_orders_data)
+        
+        # Without a shared cache the feed sections have no ETag, and neither does the whole
+        tags = {name: tag for name, (tag, _) in sections.items()}
+        etag = content_etag('rider_bootstrap', tags) if all(tags.values()) else None
+        unchanged = not_modified(request, etag)
+        if unchanged:
+            return unchanged
+        
+        bootstrap_data = {'available_orders': None}
+        for name, (section_etag, load) in sections.items():
+            if section_etag and request.GET.get(name, '').strip('"') == section_etag.strip('"'):
+                bootstrap_data[name] = {'etag': section_etag, 'not_modified': True}
+            else:
+                bootstrap_data[name] = {'etag': section_etag, 'data': load()}
         
-        month_earnings = sum(
-            assignment.delivery_fee 
-            for assignment in completed_assignments
-            if assignment.delivered_at and assignment.delivered_at.date() >= this_month_start
-        )
+        return set_etag(Response(bootstrap_data), etag)
         
+    except RiderProfile.DoesNotExist:
         return Response({
-            'total_earnings': float(total_earnings),
-            'total_deliveries': total_deliveries,
-            'today_earnings': float(today_earnings),
-            'week_earnings': float(week_earnings),
-            'month_earnings': float(month_earnings),
-            'average_per_delivery': float(total_earnings / total_deliveries) if total_deliveries > 0 else 0.0
-        })
-        
+            'error': 'Rider profile not found'
+        }, status=404)
     except Exception as e:
         return Response({
             'error': str(e)
         }, status=500)
 
 
+# Order columns the app's history screen shows, read from the live order or,
+# once it has been archived, from the archived copy
+HISTORY_ORDER_FIELDS = (
+    'id', 'order_number', 'total_amount',
+    'customer__first_name', 'customer__last_name', 'customer__phone',
+    'restaurant__name', 'restaurant__address',
+)
+# Columns the app's history screen shows; nothing else is read
+HISTORY_FIELDS = (
+    'id', 'status', 'delivery_fee', 'assigned_at', 'picked_up_at', 'delivered_at',
+    'pickup_notes', 'delivery_notes',
+    *(f'order__{field}' for field in HISTORY_ORDER_FIELDS),
+    *(f'archived_order__{field}' for field in HISTORY_ORDER_FIELDS),
+)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_delivery_history(request):
-    """Get rider's complete delivery history"""
+    """
+    Get rider's delivery history, newest first, one page at a time.
+
+    Query params:
+        cursor: Opaque token from a previous response's next/previous cursor
+        limit: Page size (default 20, max 100)
+        order_number: Full order number or its first few characters
+        from, to: Only assignments made on or between these dates (YYYY-MM-DD)
+
+    The page is returned as a list; the cursors for the neighbouring pages
+    are sent in the X-Next-Cursor and X-Previous-Cursor headers. Rows are
+    read as values() projections of just the fields below.
+    """
     try:
         rider = get_object_or_404(RiderProfile, user=request.user)
         
+        try:
+            limit = min(max(int(request.GET.get('limit', 20)), 1), 100)
+        except ValueError:
+            return Response({
+                'error': 'limit must be a number'
+            }, status=400)
+        
         # Get all assignments (completed and cancelled)
         assignments = DeliveryAssignment.objects.filter(
             rider=rider
-        ).select_related(
-            'order', 'order__customer', 'order__restaurant'
-        ).order_by('-assigned_at')
+        ).values(*HISTORY_FIELDS)
+        
+        # Optional date range, as assigned_at bounds so the (rider, assigned_at) index applies
+        for param, lookup in (('from', 'assigned_at__gte'), ('to', 'assigned_at__lt')):
+            value = request.GET.get(param)
+            if not value:
+                continue
+            try:
+                day = date.fromisoformat(value)
+            except ValueError:
+                return Response({
+                    'error': f'{param} must be a date (YYYY-MM-DD)'
+                }, status=400)
+            if param == 'to':
+                day += timedelta(days=1)
+            bound = timezone.make_aware(datetime.combine(day, time.min))
+            assignments = assignments.filter(**{lookup: bound})
+        
+        # Optional exact or prefix match on the indexed order number
+        order_number = request.GET.get('order_number')
+        if order_number:
+            number_q = order_number_q(order_number, field='order__order_number')
+            if number_q is None:
+                return Response({
+                    'error': 'Invalid order number'
+                }, status=400)
+            assignments = assignments.filter(
+                number_q | order_number_q(order_number, field='archived_order__order_number')
+            )
+        
+        try:
+            page = CursorPaginator(assignments, limit, field='assigned_at').page(request.GET.get('cursor'))
+        except InvalidCursor:
+            return Response({
+                'error': 'Invalid cursor'
+            }, status=400)
         
         history_data = []
-        for assignment in assignments:
+        for row in page:
+            prefix = 'order__' if row['order__id'] else 'archived_order__'
             history_data.append({
-                'id': str(assignment.id),
+                'id': str(row['id']),
                 'order': {
-                    'id': assignment.order.id,
-                    'order_number': assignment.order.order_number,
+                    'id': row[f'{prefix}id'],
+                    'order_number': row[f'{prefix}order_number'],
                     'customer': {
-                        'first_name': assignment.order.customer.first_name,
-                        'last_name': assignment.order.customer.last_name,
-                        'phone': getattr(assignment.order.customer, 'phone', '')
+                        'first_name': row[f'{prefix}customer__first_name'],
+                        'last_name': row[f'{prefix}customer__last_name'],
+                        'phone': row[f'{prefix}customer__phone'] or ''
                     },
                     'restaurant': {
-                        'name': assignment.order.restaurant.name,
-                        'address': assignment.order.restaurant.address
+                        'name': row[f'{prefix}restaurant__name'],
+                        'address': row[f'{prefix}restaurant__address']
                     },
-                    'total_amount': float(assignment.order.total_amount)
+                    'total_amount': float(row[f'{prefix}total_amount'] or 0)
                 },
-                'status': assignment.status,
-                'delivery_fee': float(assignment.delivery_fee),
-                'assigned_at': assignment.assigned_at.isoformat(),
-                'picked_up_at': assignment.picked_up_at.isoformat() if assignment.picked_up_at else None,
-                'delivered_at': assignment.delivered_at.isoformat() if assignment.delivered_at else None,
-                'pickup_notes': assignment.pickup_notes or '',
-                'delivery_notes': assignment.delivery_notes or ''
+                'status': row['status'],
+                'delivery_fee': float(row['delivery_fee']),
+                'assigned_at': row['assigned_at'].isoformat(),
+                'picked_up_at': row['picked_up_at'].isoformat() if row['picked_up_at'] else None,
+                'delivered_at': row['delivered_at'].isoformat() if row['delivered_at'] else None,
+                'pickup_notes': row['pickup_notes'] or '',
+                'delivery_notes': row['delivery_notes'] or ''
             })
         
-        return Response(history_data)
+        response = Response(history_data)
+        if page.has_next():
+            response['X-Next-Cursor'] = page.next_cursor
+        if page.has_previous():
+            response['X-Previous-Cursor'] = page.previous_cursor
+        return response
         
     except Exception as e:
         return Response({
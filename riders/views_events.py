@@ -0,0 +1,94 @@
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+import asyncio
+import json
+import time
+
+from core.pubsub import get_broker
+from .events import RIDERS_CHANNEL, rider_channel
+from .models import RiderProfile
+
+# A comment line this often keeps proxies and mobile networks from closing an idle stream
+KEEPALIVE_SECONDS = getattr(settings, 'RIDER_EVENTS_KEEPALIVE_SECONDS', 15)
+# Streams are closed after this long so clients reconnect and spread across workers
+MAX_STREAM_SECONDS = getattr(settings, 'RIDER_EVENTS_MAX_SECONDS', 30 * 60)
+# Client reconnect delay sent with the stream, in milliseconds
+RETRY_MS = 3000
+
+
+def format_event(event_type, data, event_id=None):
+    """One server-sent event"""
+    lines = []
+    if event_id:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event_type}')
+    lines.append(f"data: {json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))}")
+    return '\n'.join(lines) + '\n\n'
+
+
+async def event_stream(subscription):
+    """Relay a subscription's events until the client goes away or the stream times out"""
+    deadline = time.monotonic() + MAX_STREAM_SECONDS
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        # Anything may have changed while the app was disconnected
+        yield format_event('resync', {})
+
+        while time.monotonic() < deadline:
+            try:
+                event = await subscription.get(timeout=KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+
+            if subscription.overflowed:
+                # Events were dropped; tell the app to refetch its feeds instead
+                subscription.overflowed = False
+                yield format_event('resync', {})
+            yield format_event(event['type'], event['data'], event['id'])
+    finally:
+        subscription.close()
+
+
+@require_GET
+async def rider_events(request):
+    """
+    Server-sent event stream for the rider app.
+
+    Pushes order_ready and order_claimed to every connected rider, and
+    assignment_updated to the assigned rider. A resync event means the app
+    should refetch its feeds (cheap with their ETags). Needs the ASGI
+    application in config/asgi.py; under WSGI the stream would hold a
+    worker for its whole life, so it is refused.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({
+            'error': 'The event stream is only served by the ASGI application'
+        }, status=501)
+
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({
+            'error': 'Authentication required'
+        }, status=401)
+
+    rider = await RiderProfile.objects.select_related('user').filter(user=user).afirst()
+    if rider is None:
+        return JsonResponse({
+            'error': 'Rider profile not found'
+        }, status=404)
+
+    if not rider.is_approved or not rider.is_active:
+        return JsonResponse({
+            'error': 'Only approved, active riders can receive events'
+        }, status=403)
+
+    subscription = get_broker().subscribe([RIDERS_CHANNEL, rider_channel(rider.id)])
+    response = StreamingHttpResponse(event_stream(subscription), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -96,12 +96,15 @@ class AfricaTalkingSMS:
         
         Args:
             order: Order object
+            
+        Returns:
+            dict: send_sms response, or None if the customer has no phone number
         """
         try:
             customer_phone = getattr(order.customer, 'phone', '')
             if not customer_phone:
                 logger.warning(f"No phone number for customer {order.customer.username}")
-                return
+                return None
             
             message = f"""Dear {order.customer.get_full_name() or order.customer.username},
 
@@ -123,9 +126,11 @@ Thank you for choosing Mobile Meals Center!
                 logger.info(f"Order confirmation SMS sent to {customer_phone}")
             else:
                 logger.error(f"Failed to send order confirmation: {response['message']}")
+            return response
                 
         except Exception as e:
             logger.error(f"Error sending order confirmation: {e}")
+            return {'status': 'error', 'message': str(e)}
     
     def send_rider_assignment_notification(self, delivery_assignment):
         """
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import SystemSettings, AdminActivityLog, Complaint
+from .models import SystemSettings, AdminActivityLog, Complaint, DailyRestaurantMetrics, DailyPlatformMetrics
 
 
 @admin.register(SystemSettings)
@@ -41,3 +41,21 @@ class ComplaintAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at')
         }),
     )
+
+
+@admin.register(DailyRestaurantMetrics)
+class DailyRestaurantMetricsAdmin(admin.ModelAdmin):
+    list_display = ['restaurant', 'date', 'orders', 'revenue', 'pos_orders', 'pos_sales', 'updated_at']
+    list_filter = ['date']
+    search_fields = ['restaurant__name']
+    raw_id_fields = ['restaurant']
+    date_hierarchy = 'date'
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('restaurant')
+
+
+@admin.register(DailyPlatformMetrics)
+class DailyPlatformMetricsAdmin(admin.ModelAdmin):
+    list_display = ['date', 'orders', 'revenue', 'pos_orders', 'pos_sales', 'updated_at']
+    date_hierarchy = 'date'
@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Sum, Q
+from django.utils import timezone
+from datetime import timedelta
+from decimal import Decimal
+
+from accounts.models import User
+from restaurants.models import Restaurant
+from meals.models import Meal
+from orders.models import Order
+from .models import DailyPlatformMetrics, DailyRestaurantMetrics
+
+DASHBOARD_CACHE_KEY = 'superadmin_dashboard_stats'
+# The snapshot is also dropped whenever a user, restaurant or meal changes; order tiles
+# only catch up when it expires
+DASHBOARD_TTL = getattr(settings, 'ADMIN_DASHBOARD_CACHE_SECONDS', 60)
+ORDER_STATUSES = ['pending', 'confirmed', 'preparing', 'ready', 'delivered', 'cancelled']
+
+
+def build_dashboard_stats():
+    """
+    Every dashboard tile, from one conditional aggregate per table; order
+    counts and revenue over time come from the daily platform rollup.
+
+    Returns:
+        dict: Template context values, with top_restaurants and top_meals as
+            lists of {'pk', 'name', 'order_count'}
+    """
+    today = timezone.localdate()
+    week_ago = today - timedelta(days=7)
+    zero = Decimal('0.00')
+
+    stats = User.objects.aggregate(
+        total_users=Count('id'),
+        total_customers=Count('id', filter=Q(user_type='customer')),
+        total_riders=Count('id', filter=Q(user_type='rider')),
+        pending_riders=Count('id', filter=Q(user_type='rider', is_approved=False)),
+        approved_riders=Count('id', filter=Q(user_type='rider', is_approved=True)),
+        new_users_week=Count('id', filter=Q(date_joined__gte=week_ago))
+    )
+    stats.update(Restaurant.objects.aggregate(
+        total_restaurants=Count('id'),
+        active_restaurants=Count('id', filter=Q(is_active=True)),
+        new_restaurants_week=Count('id', filter=Q(created_at__gte=week_ago))
+    ))
+    stats.update(Meal.objects.aggregate(
+        total_meals=Count('id'),
+        available_meals=Count('id', filter=Q(is_available=True))
+    ))
+    stats.update(Order.objects.aggregate(
+        total_orders=Count('id'),
+        **{
+            f'{status}_orders': Count('id', filter=Q(status=status))
+            for status in ORDER_STATUSES
+        }
+    ))
+    stats.update(DailyPlatformMetrics.objects.aggregate(
+        orders_week=Sum('orders', filter=Q(date__gte=week_ago), default=0),
+        total_revenue=Sum('revenue', default=zero),
+        revenue_week=Sum('revenue', filter=Q(date__gte=week_ago), default=zero)
+    ))
+
+    # Top restaurants and meals by orders
+    stats['top_restaurants'] = list(DailyRestaurantMetrics.objects.values(
+        pk=F('restaurant_id'), name=F('restaurant__name')
+    ).annotate(order_count=Sum('orders')).order_by('-order_count')[:5])
+    stats['top_meals'] = list(Meal.objects.annotate(
+        order_count=Count('orderitem')
+    ).order_by('-order_count').values('pk', 'name', 'order_count')[:5])
+
+    return stats
+
+
+def get_dashboard_stats():
+    """Dashboard tiles, cached for DASHBOARD_TTL seconds"""
+    return cache.get_or_set(DASHBOARD_CACHE_KEY, build_dashboard_stats, DASHBOARD_TTL)
+
+
+def invalidate_dashboard_stats():
+    """Drop the cached tiles once the current transaction commits"""
+    transaction.on_commit(lambda: cache.delete(DASHBOARD_CACHE_KEY))
@@ -0,0 +1,81 @@
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from datetime import datetime
+import logging
+
+from .models import DailyRestaurantMetrics, DailyPlatformMetrics
+
+logger = logging.getLogger(__name__)
+
+# Online orders count towards revenue once confirmed, whatever status they move
+# through afterwards (ready, delivering, delivered...), unless cancelled
+NON_REVENUE_STATUSES = ('pending', 'cancelled')
+REVENUE_Q = ~Q(status__in=NON_REVENUE_STATUSES)
+
+
+def is_revenue(status):
+    """Whether an order in this status counts towards revenue"""
+    return status is not None and status not in NON_REVENUE_STATUSES
+
+
+def day_of(value):
+    """Local date a row is counted on"""
+    if isinstance(value, datetime):
+        return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+    return value
+
+
+def record(restaurant_id, created_at, **amounts):
+    """
+    Add amounts to the restaurant's and the platform's day once the current
+    transaction commits, so the order's own transaction holds no lock on
+    the shared daily rows. A write lost here is put right by rebuild_metrics.
+    """
+    day = day_of(created_at or timezone.now())
+
+    def apply():
+        try:
+            DailyRestaurantMetrics.record(restaurant_id, day, **amounts)
+            DailyPlatformMetrics.record(day, **amounts)
+        except Exception as e:
+            logger.error(f"Error recording daily metrics for restaurant {restaurant_id} on {day}: {e}")
+
+    transaction.on_commit(apply)
+
+
+def order_saved(order, old_status, created):
+    """Count a new order, and its value when it enters or leaves a revenue status"""
+    amounts = {}
+    if created:
+        amounts['orders'] = 1
+    was_revenue = not created and is_revenue(old_status)
+    now_revenue = is_revenue(order.status)
+    if now_revenue and not was_revenue:
+        amounts['revenue'] = order.total_amount
+    elif was_revenue and not now_revenue:
+        amounts['revenue'] = -order.total_amount
+    if amounts:
+        record(order.restaurant_id, order.created_at, **amounts)
+
+
+def order_deleted(order, old_status):
+    amounts = {'orders': -1}
+    if is_revenue(old_status):
+        amounts['revenue'] = -order.total_amount
+    record(order.restaurant_id, order.created_at, **amounts)
+
+
+def pos_order_saved(pos_order, old_status, created):
+    """Count a POS order when it is completed, and take it back if it is refunded or cancelled"""
+    was_completed = not created and old_status == 'completed'
+    is_completed = pos_order.status == 'completed'
+    if is_completed and not was_completed:
+        record(pos_order.restaurant_id, pos_order.created_at, pos_orders=1, pos_sales=pos_order.total_amount)
+    elif was_completed and not is_completed:
+        record(pos_order.restaurant_id, pos_order.created_at, pos_orders=-1, pos_sales=-pos_order.total_amount)
+
+
+def pos_order_deleted(pos_order, old_status):
+    if old_status == 'completed':
+        record(pos_order.restaurant_id, pos_order.created_at, pos_orders=-1, pos_sales=-pos_order.total_amount)
@@ -72,7 +72,7 @@ class Complaint(models.Model):
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
     subject = models.CharField(max_length=200)
     description = models.TextField()
-    order_number = models.CharField(max_length=50, blank=True, null=True, help_text='Related order number if applicable')
+    order_number = models.CharField(max_length=50, blank=True, null=True, db_index=True, help_text='Related order number if applicable')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     priority = models.CharField(max_length=10, choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High')], default='medium')
     admin_notes = models.TextField(blank=True, help_text='Internal notes from admin')
@@ -94,3 +94,72 @@ class Complaint(models.Model):
         self.resolved_by = admin_user
         self.resolved_at = timezone.now()
         self.save()
+
+
+
+class DailyMetrics(models.Model):
+    """Order and POS totals for one day, kept up to date by superadmin.metrics"""
+    
+    date = models.DateField()
+    # Online orders placed that day, and the value of those confirmed and not cancelled
+    orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Completed POS orders
+    pos_orders = models.IntegerField(default=0)
+    pos_sales = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        abstract = True
+        ordering = ['-date']
+    
+    @classmethod
+    def add(cls, lookup, amounts):
+        """Add amounts (negative to take them back) to the row matching lookup, creating it if needed"""
+        from django.db import IntegrityError, transaction
+        from django.db.models import F
+        
+        changes = {field: F(field) + value for field, value in amounts.items()}
+        if cls.objects.filter(**lookup).update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(**lookup, **amounts)
+        except IntegrityError:
+            # Another order created the day's row first
+            cls.objects.filter(**lookup).update(**changes)
+
+
+class DailyRestaurantMetrics(DailyMetrics):
+    restaurant = models.ForeignKey('restaurants.Restaurant', on_delete=models.CASCADE, related_name='daily_metrics')
+    
+    class Meta(DailyMetrics.Meta):
+        verbose_name = 'Daily Restaurant Metrics'
+        verbose_name_plural = 'Daily Restaurant Metrics'
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant', 'date'], name='unique_daily_restaurant_metrics'),
+        ]
+    
+    def __str__(self):
+        return f"{self.restaurant_id} {self.date}"
+    
+    @classmethod
+    def record(cls, restaurant_id, day, **amounts):
+        cls.add({'restaurant_id': restaurant_id, 'date': day}, amounts)
+
+
+class DailyPlatformMetrics(DailyMetrics):
+    
+    class Meta(DailyMetrics.Meta):
+        verbose_name = 'Daily Platform Metrics'
+        verbose_name_plural = 'Daily Platform Metrics'
+        constraints = [
+            models.UniqueConstraint(fields=['date'], name='unique_daily_platform_metrics'),
+        ]
+    
+    def __str__(self):
+        return str(self.date)
+    
+    @classmethod
+    def record(cls, day, **amounts):
+        cls.add({'date': day}, amounts)
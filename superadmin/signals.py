@@ -0,0 +1,59 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from accounts.models import User
+from restaurants.models import Restaurant
+from restaurants.models_pos import POSOrder
+from meals.models import Meal
+from orders.models import Order
+from orders.archive import archiving
+from .dashboard import invalidate_dashboard_stats
+from . import metrics
+
+
+@receiver(post_init, sender=Order)
+@receiver(post_init, sender=POSOrder)
+def remember_loaded_status(sender, instance, **kwargs):
+    """Status as loaded, so the metrics see what a save changed without another query"""
+    instance._metrics_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Order)
+def record_order_metrics(sender, instance, created, **kwargs):
+    metrics.order_saved(instance, instance._metrics_status, created)
+    instance._metrics_status = instance.status
+
+
+@receiver(post_delete, sender=Order)
+def record_deleted_order_metrics(sender, instance, **kwargs):
+    if archiving.get():
+        # Archived orders still count towards the days they were placed on
+        return
+    metrics.order_deleted(instance, instance._metrics_status)
+
+
+@receiver(post_save, sender=POSOrder)
+def record_pos_order_metrics(sender, instance, created, **kwargs):
+    metrics.pos_order_saved(instance, instance._metrics_status, created)
+    instance._metrics_status = instance.status
+
+
+@receiver(post_delete, sender=POSOrder)
+def record_deleted_pos_order_metrics(sender, instance, **kwargs):
+    metrics.pos_order_deleted(instance, instance._metrics_status)
+
+
+# Orders change far too often to drop the tiles on every save; their tiles
+# (counts, revenue, top restaurants and meals) catch up within DASHBOARD_TTL
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+@receiver(post_save, sender=Meal)
+@receiver(post_delete, sender=Meal)
+def invalidate_dashboard(sender, update_fields=None, **kwargs):
+    """A change to a counted user, restaurant or meal makes the cached dashboard tiles stale"""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        # Logging in changes nothing the dashboard counts
+        return
+    invalidate_dashboard_stats()
@@ -0,0 +1,109 @@
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+from decimal import Decimal
+from io import StringIO
+
+from accounts.models import User
+from meals.models import Meal
+from orders.checkout import place_orders
+from orders.models import Order
+from restaurants.models import Restaurant
+from riders.dispatch import claim_order
+from riders.models import DeliveryAssignment, RiderProfile
+from riders.transitions import transition
+from .models import DailyRestaurantMetrics, DailyPlatformMetrics
+
+
+class DailyMetricsTests(TestCase):
+    """The rollups written live by the signals must match a rebuild from the orders"""
+
+    def setUp(self):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'pw', user_type='restaurant')
+        self.restaurant = Restaurant.objects.create(
+            owner=owner, name='Test Kitchen', description='Test', phone='0700000000',
+            address='Test address', latitude=Decimal('-1.28'), longitude=Decimal('36.80')
+        )
+        self.meal = Meal.objects.create(
+            restaurant=self.restaurant, name='Pilau', description='Test', price=Decimal('100.00')
+        )
+        self.customer = User.objects.create_user('customer', 'customer@example.com', 'pw')
+        rider_user = User.objects.create_user('rider', 'rider@example.com', 'pw', user_type='rider')
+        self.rider = RiderProfile.objects.get_or_create(user=rider_user)[0]
+
+    def checkout(self):
+        """Place one order through checkout, committing so the metrics are applied"""
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                _, orders = place_orders(
+                    self.customer,
+                    {str(self.meal.pk): 2},
+                    Order(delivery_address='Test address', phone='0700000000', notes='')
+                )
+        return Order.objects.get(pk=orders[0].pk)
+
+    def set_status(self, order, status):
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = status
+            order.save()
+
+    def rollups(self):
+        restaurant_days = list(DailyRestaurantMetrics.objects.order_by('restaurant_id', 'date').values(
+            'restaurant_id', 'date', 'orders', 'revenue', 'pos_orders', 'pos_sales'
+        ))
+        platform_days = list(DailyPlatformMetrics.objects.order_by('date').values(
+            'date', 'orders', 'revenue', 'pos_orders', 'pos_sales'
+        ))
+        return restaurant_days, platform_days
+
+    def assert_matches_rebuild(self):
+        live = self.rollups()
+        call_command('rebuild_metrics', stdout=StringIO())
+        self.assertEqual(live, self.rollups())
+
+    def test_rider_delivered_order_counts_revenue_once(self):
+        order = self.checkout()
+        self.set_status(order, 'confirmed')
+        self.set_status(order, 'ready')
+
+        # Claimed with update(), then delivered through transition() on a freshly
+        # loaded assignment, as the rider views do
+        with self.captureOnCommitCallbacks(execute=True):
+            assignment = claim_order(order, self.rider, delivery_fee=Decimal('50.00'))
+        assignment = DeliveryAssignment.objects.select_related('order').get(pk=assignment.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            transition(assignment, 'picked_up')
+        with self.captureOnCommitCallbacks(execute=True):
+            transition(assignment, 'delivered')
+
+        day = DailyRestaurantMetrics.objects.get(restaurant=self.restaurant)
+        self.assertEqual(day.orders, 1)
+        self.assertEqual(day.revenue, Decimal('200.00'))
+        self.assert_matches_rebuild()
+
+    def test_cancelled_assignment_returns_order_to_ready(self):
+        order = self.checkout()
+        self.set_status(order, 'confirmed')
+        self.set_status(order, 'ready')
+        with self.captureOnCommitCallbacks(execute=True):
+            assignment = claim_order(order, self.rider, delivery_fee=Decimal('50.00'))
+
+        # As CancelAssignmentView does it, with plain saves
+        order = Order.objects.get(pk=order.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            assignment.status = 'cancelled'
+            assignment.save()
+        self.set_status(order, 'ready')
+
+        self.assertEqual(DailyRestaurantMetrics.objects.get(restaurant=self.restaurant).revenue, Decimal('200.00'))
+        self.assert_matches_rebuild()
+
+    def test_cancelled_order_leaves_revenue(self):
+        order = self.checkout()
+        self.set_status(order, 'confirmed')
+        self.set_status(order, 'cancelled')
+
+        day = DailyRestaurantMetrics.objects.get(restaurant=self.restaurant)
+        self.assertEqual(day.orders, 1)
+        self.assertEqual(day.revenue, Decimal('0.00'))
+        self.assert_matches_rebuild()
@@ -5,11 +5,11 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.views import LoginView
 from django.contrib import messages
 from django.urls import reverse_lazy
-from django.db.models import Count, Sum, Q, Avg
+from django.db.models import Count, Sum, Q, Avg, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.http import JsonResponse
 from django.utils import timezone
 from django.conf import settings
-from datetime import timedelta
 from decimal import Decimal
 import sys
 import os
@@ -18,14 +18,45 @@ from sms_service import sms_service
 
 from accounts.models import User
 from restaurants.models import Restaurant
-from restaurants.models_pos import POSSession, POSOrder, POSOrderItem
+from restaurants.models_pos import POSSession, POSOrderItem
 from meals.models import Meal, Category
-from orders.models import Order, OrderItem
+from orders.models import Order, OrderItem, ArchivedOrder, ORDER_NUMBER_LENGTH, order_number_q
 from riders.models import RiderProfile, DeliveryAssignment
-from .models import AdminActivityLog, SystemSettings, Complaint
+from riders.dispatch import suggest_riders
+from core.pagination import CursorPaginationMixin
+from .models import AdminActivityLog, SystemSettings, Complaint, DailyPlatformMetrics, DailyRestaurantMetrics
+from .dashboard import get_dashboard_stats
 from .forms import SuperAdminLoginForm
 
 
+def order_number_search(search, text_q):
+    """
+    Q for a search box that takes order numbers as well as text.
+
+    A search starting with '#', or a full order number, looks up order
+    numbers only. Anything else that could be the start of one ('cafe',
+    '1') matches either the order number or text_q, so name searches still
+    find their rows.
+
+    Args:
+        search: str - The search box value
+        text_q: Q - The text field lookup for search
+
+    Returns:
+        Q
+    """
+    number_q = order_number_q(search)
+    if number_q is None:
+        return text_q
+    search = search.strip()
+    if search.startswith('#') or len(search) == ORDER_NUMBER_LENGTH:
+        return number_q
+    return number_q | text_q
+    if search.strip().startswith('#') or any(qs.filter(number_q).exists() for qs in querysets):
+        return number_q
+    return None
+
+
 class SuperAdminRequiredMixin(UserPassesTestMixin):
     """Mixin to ensure only superusers can access"""
     def test_func(self):
@@ -42,52 +73,8 @@ class AdminDashboardView(SuperAdminRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Date ranges
-        today = timezone.now().date()
-        week_ago = today - timedelta(days=7)
-        month_ago = today - timedelta(days=30)
-        
-        # Overall statistics
-        context['total_users'] = User.objects.count()
-        context['total_customers'] = User.objects.filter(user_type='customer').count()
-        context['total_riders'] = User.objects.filter(user_type='rider').count()
-        context['pending_riders'] = User.objects.filter(user_type='rider', is_approved=False).count()
-        context['approved_riders'] = User.objects.filter(user_type='rider', is_approved=True).count()
-        context['total_restaurants'] = Restaurant.objects.count()
-        context['active_restaurants'] = Restaurant.objects.filter(is_active=True).count()
-        context['total_meals'] = Meal.objects.count()
-        context['available_meals'] = Meal.objects.filter(is_available=True).count()
-        context['total_orders'] = Order.objects.count()
-        context['total_revenue'] = Order.objects.filter(
-            status__in=['confirmed', 'preparing', 'ready', 'delivered']
-        ).aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
-        
-        # Recent statistics
-        context['new_users_week'] = User.objects.filter(date_joined__gte=week_ago).count()
-        context['new_restaurants_week'] = Restaurant.objects.filter(created_at__gte=week_ago).count()
-        context['orders_week'] = Order.objects.filter(created_at__gte=week_ago).count()
-        context['revenue_week'] = Order.objects.filter(
-            created_at__gte=week_ago,
-            status__in=['confirmed', 'preparing', 'ready', 'delivered']
-        ).aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
-        
-        # Order status breakdown
-        context['pending_orders'] = Order.objects.filter(status='pending').count()
-        context['confirmed_orders'] = Order.objects.filter(status='confirmed').count()
-        context['preparing_orders'] = Order.objects.filter(status='preparing').count()
-        context['ready_orders'] = Order.objects.filter(status='ready').count()
-        context['delivered_orders'] = Order.objects.filter(status='delivered').count()
-        context['cancelled_orders'] = Order.objects.filter(status='cancelled').count()
-        
-        # Top restaurants by orders
-        context['top_restaurants'] = Restaurant.objects.annotate(
-            order_count=Count('orders')
-        ).order_by('-order_count')[:5]
-        
-        # Top meals by orders
-        context['top_meals'] = Meal.objects.annotate(
-            order_count=Count('orderitem')
-        ).order_by('-order_count')[:5]
+        # Tiles come from a few conditional aggregates, cached briefly
+        context.update(get_dashboard_stats())
         
         # Recent activity
         context['recent_orders'] = Order.objects.select_related(
@@ -110,12 +97,19 @@ class RestaurantManagementView(SuperAdminRequiredMixin, ListView):
     paginate_by = 20
     
     def get_queryset(self):
+        # One correlated subquery per counter, run only for the page's rows; joining
+        # meals and orders together would multiply them (meals x orders per restaurant)
+        meals = Meal.objects.filter(
+            restaurant=OuterRef('pk')
+        ).order_by().values('restaurant').annotate(total=Count('id')).values('total')
+        # Orders and revenue from the daily rollup rather than every order the restaurant ever had
+        daily = DailyRestaurantMetrics.objects.filter(
+            restaurant=OuterRef('pk')
+        ).order_by().values('restaurant')
         queryset = Restaurant.objects.select_related('owner').annotate(
-            meal_count=Count('meals'),
-            order_count=Count('orders'),
-            total_revenue=Sum('orders__total_amount', filter=Q(
-                orders__status__in=['confirmed', 'preparing', 'ready', 'delivered']
-            ))
+            meal_count=Coalesce(Subquery(meals), 0),
+            order_count=Coalesce(Subquery(daily.annotate(total=Sum('orders')).values('total')), 0),
+            total_revenue=Subquery(daily.annotate(total=Sum('revenue')).values('total'))
         )
         
         # Search
@@ -194,30 +188,37 @@ class UserManagementView(SuperAdminRequiredMixin, ListView):
         return queryset.order_by('-date_joined')
 
 
-class OrderManagementView(SuperAdminRequiredMixin, ListView):
+class OrderManagementView(SuperAdminRequiredMixin, CursorPaginationMixin, ListView):
     model = Order
     template_name = 'superadmin/orders.html'
     context_object_name = 'orders'
     paginate_by = 20
     
     def get_queryset(self):
-        queryset = Order.objects.select_related('customer', 'restaurant')
-        
-        # Search
+        return self.filter_orders(Order.objects.select_related('customer', 'restaurant'))
+    
+    def get_cursor_querysets(self, queryset):
+        # Older closed orders live in the archive; page through both as one list
+        archived = self.filter_orders(ArchivedOrder.objects.select_related('customer', 'restaurant'))
+        return [queryset, archived]
+    
+    def filter_orders(self, queryset):
+        """Apply the search and status filters to a live or archived order queryset"""
+        # Search: order numbers use the indexed column, alongside the names unless the search is clearly a number
         search = self.request.GET.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(order_number__icontains=search) |
+            queryset = queryset.filter(order_number_search(
+                search,
                 Q(customer__username__icontains=search) |
                 Q(restaurant__name__icontains=search)
-            )
+            ))
         
         # Filter by status
         status = self.request.GET.get('status')
         if status:
             queryset = queryset.filter(status=status)
         
-        return queryset.order_by('-created_at')
+        return queryset
 
 
 class ToggleRestaurantStatusView(SuperAdminRequiredMixin, DetailView):
@@ -355,15 +356,15 @@ class ComplaintManagementView(SuperAdminRequiredMixin, ListView):
     def get_queryset(self):
         queryset = Complaint.objects.select_related('user', 'resolved_by')
         
-        # Search
+        # Search: order numbers use the indexed column, alongside the text fields unless the search is clearly a number
         search = self.request.GET.get('search')
         if search:
-            queryset = queryset.filter(
+            queryset = queryset.filter(order_number_search(
+                search,
                 Q(subject__icontains=search) |
                 Q(description__icontains=search) |
-                Q(user__username__icontains=search) |
-                Q(order_number__icontains=search)
-            )
+                Q(user__username__icontains=search)
+            ))
         
         # Filter by status
         status = self.request.GET.get('status')
@@ -439,24 +440,19 @@ class POSManagementView(SuperAdminRequiredMixin, TemplateView):
         # Get active POS sessions
         active_sessions = POSSession.objects.filter(is_active=True).count()
         
-        # Get today's POS sales
-        from django.utils import timezone
-        today = timezone.now().date()
-        today_pos_orders = POSOrder.objects.filter(
-            created_at__date=today,
-            status='completed'
-        )
-        today_sales = today_pos_orders.aggregate(
-            total=Sum('total_amount')
-        )['total'] or Decimal('0.00')
-        today_order_count = today_pos_orders.count()
+        # Get today's POS sales from the daily rollups
+        today = timezone.localdate()
+        today_metrics = DailyPlatformMetrics.objects.filter(date=today).first()
+        today_sales = today_metrics.pos_sales if today_metrics else Decimal('0.00')
+        today_order_count = today_metrics.pos_orders if today_metrics else 0
         
         # Get top restaurants by POS sales
-        top_restaurants = Restaurant.objects.annotate(
-            pos_sales=Sum('pos_orders__total_amount', filter=Q(
-                pos_orders__status='completed',
-                pos_orders__created_at__date=today
-            ))
+        top_restaurants = Restaurant.objects.select_related('owner').filter(
+            daily_metrics__date=today,
+            daily_metrics__pos_orders__gt=0
+        ).annotate(
+            pos_sales=F('daily_metrics__pos_sales'),
+            pos_order_count=F('daily_metrics__pos_orders')
         ).order_by('-pos_sales')[:10]
         
         # Recent POS sessions
@@ -856,6 +852,12 @@ class OrderAssignmentView(SuperAdminRequiredMixin, TemplateView):
             is_online=True
         ).select_related('user').order_by('user__username')
         
+        # Suggest the nearest riders to each order's restaurant
+        ready_orders = list(ready_orders)
+        suggestions = suggest_riders(ready_orders, k=3)
+        for order in ready_orders:
+            order.suggested_riders = suggestions[order.pk]
+        
         # Get recent assignments
         recent_assignments = DeliveryAssignment.objects.select_related(
             'order', 'rider', 'rider__user'
@@ -864,7 +866,7 @@ class OrderAssignmentView(SuperAdminRequiredMixin, TemplateView):
         context['ready_orders'] = ready_orders
         context['available_riders'] = available_riders
         context['recent_assignments'] = recent_assignments
-        context['total_ready_orders'] = ready_orders.count()
+        context['total_ready_orders'] = len(ready_orders)
         context['total_available_riders'] = available_riders.count()
         
         return context